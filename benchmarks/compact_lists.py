@@ -0,0 +1,45 @@
+"""Compares the memory and merge time of numeric lists stored as lists and arrays.
+
+Usage:
+    python benchmarks/compact_lists.py --fragments 50 --length 100000
+"""
+import argparse
+import logging
+import random
+import time
+import tracemalloc
+
+from genconfig.utils import compact, merge, numpy
+
+
+def main():
+    """Merges fragments of long numeric lists with every storage kind."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--fragments", help="number of fragments merged", type=int, default=50)
+    parser.add_argument(
+        "--length", help="number of floats per fragment", type=int, default=100000)
+    args = parser.parse_args()
+    # every merge of the lists logs a warning
+    logging.getLogger("genconfig").setLevel(logging.ERROR)
+
+    kinds = [None, "array"] + (["numpy"] if numpy is not None else [])
+    print(f"{'kind':<8}{'peak (MB)':>12}{'merge (s)':>12}")
+    for kind in kinds:
+        random.seed(0)
+        tracemalloc.start()
+        config = {}
+        seconds = 0.0
+        for _ in range(args.fragments):
+            fragment = {"weights": [random.random() for _ in range(args.length)]}
+            fragment = compact(fragment, kind)
+            start = time.perf_counter()
+            merge(config, fragment)
+            seconds += time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+        print(f"{str(kind):<8}{peak:>12.1f}{seconds:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Compares the size, write time and read time of compressed config files.
+
+Usage:
+    python benchmarks/compression.py --copies 2000
+"""
+import argparse
+import copy
+import os
+import tempfile
+import time
+
+from genconfig.parsers import parser_list
+
+
+def main():
+    """Writes and reads a large config with every parser and compression."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--copies", help="number of copies of the sample config", type=int, default=2000)
+    parser.add_argument("--level", help="compression level", type=int)
+    args = parser.parse_args()
+
+    sample_path = os.path.join(os.path.dirname(__file__), os.pardir, "sample-config", "sample.json")
+    sample = parser_list[0]().load(sample_path, replace=True).config
+    # distinct copies, yaml would otherwise write aliases of the same object
+    config = {f"region_{i}": copy.deepcopy(sample) for i in range(args.copies)}
+
+    print(f"{'file':<16}{'size (KB)':>12}{'write (s)':>12}{'read (s)':>12}")
+    with tempfile.TemporaryDirectory() as tempdirname:
+        for config_parser in parser_list:
+            config_parser = config_parser()
+            config_parser.compression_level = args.level
+            for compression in ("", ".gz", ".xz", ".bz2"):
+                filename = os.path.join(
+                    tempdirname, f"config.{config_parser.extension}{compression}")
+                start = time.perf_counter()
+                config_parser.write(filename, config)
+                write_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                config_parser.load(filename, replace=True)
+                read_seconds = time.perf_counter() - start
+                size = os.path.getsize(filename) / 1024
+                print(f"{os.path.basename(filename):<16}{size:>12.1f}"
+                      f"{write_seconds:>12.3f}{read_seconds:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compares the peak memory of loading a large json fragment at once or incrementally.
+
+Usage:
+    python benchmarks/json_stream_memory.py --size 200
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def generate(filename: str, size: int):
+    """Writes a json config of about size MB with many top level lookup tables."""
+    table = {f"feature_{i}": {"weight": i / 7, "enabled": i % 2 == 0} for i in range(1000)}
+    table_size = len(json.dumps(table))
+    with open(filename, "w") as file:
+        file.write("{")
+        for i in range(size * 1024 * 1024 // table_size):
+            file.write(("," if i else "") + json.dumps(f"table_{i}") + ":")
+            json.dump(table, file)
+        file.write("}")
+
+
+def measure(filename: str, mode: str):
+    """Loads the config in this process and prints the peak RSS."""
+    from genconfig.parsers import JsonParser
+
+    parser = JsonParser()
+    parser.stream_size = 0 if mode == "stream" else sys.maxsize
+    start = time.perf_counter()
+    config = parser.load(filename, replace=True).config
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    peak_mb = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    print(json.dumps({"keys": len(config), "seconds": elapsed, "peak_mb": peak_mb}))
+
+
+def main():
+    """Runs each load mode in a fresh interpreter."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", help="json file size in MB", type=int, default=200)
+    parser.add_argument("--measure", help=argparse.SUPPRESS, nargs=2)
+    args = parser.parse_args()
+
+    if args.measure:
+        return measure(*args.measure)
+
+    with tempfile.TemporaryDirectory() as tempdirname:
+        filename = os.path.join(tempdirname, "large.json")
+        generate(filename, args.size)
+        print(f"file size: {os.path.getsize(filename) / 1024 / 1024:.1f} MB")
+        for mode in ("load", "stream"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--measure", filename, mode],
+                check=True, capture_output=True, text=True).stdout
+            result = json.loads(output)
+            print(f"{mode:>6}: peak RSS {result['peak_mb']:.1f} MB, "
+                  f"{result['seconds']:.2f} s, {result['keys']} keys")
+
+
+if __name__ == "__main__":
+    main()
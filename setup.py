@@ -31,9 +31,9 @@ setuptools.setup(
     python_requires=">=3.8",
     setup_requires=["setuptools_scm"],
     install_requires=required,
-    extras_require={"dev": dev_required},
+    extras_require={"dev": dev_required, "stream": ["ijson"], "numpy": ["numpy"]},
     license="MIT",
     entry_points={
-        "console_scripts": ["genconfig=genconfig.cli:main"]
+        "console_scripts": ["genconfig=genconfig.client:main"]
     }
 )
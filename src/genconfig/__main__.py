@@ -1,4 +1,4 @@
-from genconfig.cli import main
+from genconfig.client import main
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,127 @@
+"""Reads config trees directly from zip/tar archives."""
+from __future__ import annotations
+
+import io
+import logging
+import os
+import re
+import tarfile
+import zipfile
+from typing import IO, Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+archive_extensions = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+"""The file extensions recognised as config archives."""
+
+
+def is_archive(path: str) -> bool:
+    """Checks if the path points to a supported config archive.
+
+    Params:
+        path: the path to be checked
+
+    Returns:
+        bool representing if path is a zip/tar archive
+    """
+    if not isinstance(path, str):
+        return False
+    return path.lower().endswith(archive_extensions) and os.path.isfile(path)
+
+
+def _iter_members(path: str) -> Iterator[Tuple[str, IO[bytes]]]:
+    """Yields (member name, binary stream) for every regular file in the archive.
+
+    Members are visited in storage order so the archive is read in a single
+    sequential pass.
+    """
+    if path.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            members = sorted(archive.infolist(), key=lambda x: x.header_offset)
+            for member in members:
+                if member.is_dir():
+                    continue
+                with archive.open(member) as stream:
+                    yield member.filename, stream
+    else:
+        # stream mode, tar members can only be read in order
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                stream = archive.extractfile(member)
+                yield member.name, stream
+
+
+class ArchiveTree:
+    """An in-memory view of the folders and config files in an archive.
+
+    The archive is read once on construction, keeping the content of every
+    member matching one of the given parsers. Members are parsed when loaded,
+    so the members skipped by `Parser.join`, e.g. not selected, are never
+    parsed. Paths are exposed as `os.path.join(archive_path, *member_parts)`
+    so the tree can be walked by `Parser.join` in the same way as a folder.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            parsers: Iterable[Any],
+            ignored: Tuple[str] = ("", ),
+            keep: Tuple[str] = ("", )):
+        """Reads the archive members.
+
+        Params:
+            path: path to the zip/tar archive
+            parsers: the parsers used to parse the members, by file extension
+            ignored: list of file names to be ignored, support regex
+            keep: list of file names to be kept, support regex
+        """
+        assert isinstance(path, str), f"expected str got {type(path)}"
+        self.root: str = path
+        """The archive path, used as the root folder."""
+        self._parsers = {"." + parser.extension: parser for parser in parsers}
+        self._folders: Dict[str, Set[str]] = {self.root: set()}
+        self._files: Dict[str, Tuple[Any, bytes]] = {}
+
+        logger.info(f"{'='*5} Reading archive {path}")
+        for name, stream in _iter_members(path):
+            parts = [part for part in re.split(r"[\\/]", name) if part not in ("", ".")]
+            if not parts:
+                continue
+            member_path = self._add_member(parts)
+            filename, file_extension = os.path.splitext(parts[-1])
+            if file_extension not in self._parsers:
+                continue
+            parser = self._parsers[file_extension]
+            if parser._search_match(filename, ignored) or (
+                    keep != ("", ) and not parser._search_match(filename, keep)):
+                logger.debug(f"{name} filtered, not read")
+                continue
+            # tar members can only be read in order, parsed once loaded
+            self._files[member_path] = (parser, stream.read())
+
+    def _add_member(self, parts: List[str]) -> str:
+        """Registers the member and its parent folders, returns the member path."""
+        current = self.root
+        for part in parts:
+            self._folders.setdefault(current, set()).add(part)
+            current = os.path.join(current, part)
+        return current
+
+    def isdir(self, path: str) -> bool:
+        """Checks if the path is a folder within the archive."""
+        return path in self._folders
+
+    def listdir(self, path: str) -> List[str]:
+        """Lists the folder entries within the archive."""
+        return sorted(self._folders[path])
+
+    def load(self, path: str) -> Any:
+        """Parses and returns the config of an archive member."""
+        if path not in self._files:
+            return {}
+        parser, content = self._files[path]
+        logger.debug(f"Parsing archive member {path}")
+        return parser._load_stream(io.StringIO(content.decode("utf-8")))
+
@@ -2,12 +2,21 @@
 from __future__ import annotations
 
 import abc
+import hashlib
+import io
 import logging
 import os
+import pickle
 import re
-from typing import Tuple, Union, Optional, Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Iterable, Iterator, Tuple, Union, Optional, Any, Dict
 
-from genconfig.utils import merge
+from genconfig.archive import ArchiveTree, is_archive
+from genconfig.interpolate import resolve
+from genconfig.provenance import Provenance
+from genconfig.schema import Schema
+from genconfig.store import SqliteStore
+from genconfig.utils import compact, merge, select_config, select_match, split_compression
 
 logger = logging.getLogger(__name__)
 
@@ -19,14 +28,45 @@ class Parser:
     """The parser file extension."""
     config: dict = {}
     """The loaded config."""
+    cache: Optional[Dict[str, Tuple[Tuple[int, int], bytes]]] = None
+    """The pickled parsed files by path, reused while the file is unchanged."""
+    cache_size: Optional[int] = None
+    """The number of files kept in the cache, the least recently used are evicted."""
+    compression_level: Optional[int] = None
+    """The compression level of compressed files written, None for the codec default."""
+    compact_lists: Optional[str] = None
+    """Stores homogeneous numeric lists read as "array" or "numpy" arrays, None keeps lists."""
+    schema: Optional[Schema] = None
+    """The compiled schema the values read are checked against while merged."""
+    provenance: Optional[Provenance] = None
+    """Records the file and merge order of the keys read."""
+    store: Optional[SqliteStore] = None
+    """Merges the files read into the store at their key path instead of the config."""
+
+    def __init__(
+            self,
+            config: Optional[dict] = None,
+            cache: Optional[Dict[str, Tuple[Tuple[int, int], bytes]]] = None):
+        """Initiate object with optional initial config.
 
-    def __init__(self, config: Optional[dict] = None):
-        """Initiate object with optional initial config."""
+        Params:
+            config: the initial config
+            cache: the parsed file cache, can be shared between parsers of the
+                same extension to keep parsed files across loads
+        """
         if config is not None:
             assert isinstance(
                 config, dict
             ), f"Expected config to be dict get {type(config)}"
             self.config = config
+        else:
+            # do not share the loaded config between parsers
+            self.config = {}
+        if cache is not None:
+            assert isinstance(
+                cache, dict
+            ), f"Expected cache to be dict get {type(cache)}"
+            self.cache = cache
 
     def __eq__(self, parser: object) -> bool:
         """Compares if given parser is same as self."""
@@ -45,20 +85,24 @@ class Parser:
             input_path: the path to be checked
 
         Returns:
-            the input_path with file extension
+            the input_path with file extension, before the compression file
+            extension if any
 
         Example:
             `_check_extension("config")` -> config.json
 
             `_check_extension("config.json")` -> config.json
+
+            `_check_extension("config.gz")` -> config.json.gz
         """
         assert isinstance(input_path, str),\
             f"expected type str got {type(input_path)}"
 
+        input_path, compression = split_compression(input_path)
         filename, file_extension = os.path.splitext(input_path)
         if file_extension != "." + self.extension:
             input_path += "." + self.extension
-        return input_path
+        return input_path + compression
 
     @abc.abstractmethod
     def _load_method(self, filename: str) -> dict:
@@ -75,6 +119,21 @@ class Parser:
         """
         pass
 
+    @abc.abstractmethod
+    def _load_stream(self, stream: IO[str]) -> dict:
+        """Implement the load method from an opened stream for different parser.
+
+        Params:
+            stream: the opened config stream, such as a file or archive member
+
+        Returns:
+            the loaded config as a dictionary
+
+        Example:
+            `_load_stream(open("config.json"))`
+        """
+        pass
+
     @abc.abstractmethod
     def _write_method(self, filename: str) -> Parser:
         """Implement the write method for different parser.
@@ -92,6 +151,90 @@ class Parser:
         """
         pass
 
+    @abc.abstractmethod
+    def _write_stream(self, stream: IO[str]) -> Parser:
+        """Implement the write method to an opened stream for different parser.
+
+        The config content is retrieved from the object itself.
+
+        Params:
+            stream: the opened stream to write to
+
+        Returns:
+            does not return anything
+
+        Example:
+            `_write_stream(io.StringIO())`
+        """
+        pass
+
+    def _write_items(self, stream: IO[str], items: Iterable[Tuple[Any, Any]]) -> Parser:
+        """Writes the config given as top level (key, value) to an opened stream.
+
+        Parsers able to write one top level value at a time only hold that
+        value in memory, by default the whole config is built first.
+
+        Params:
+            stream: the opened stream to write to
+            items: the top level (key, value) of the config
+
+        Returns:
+            does not return anything
+
+        Example:
+            `_write_items(io.StringIO(), SqliteStore("config.sqlite").top_items())`
+        """
+        parser = type(self)(dict(items))
+        parser._write_stream(stream)
+        return self
+
+    def _load_file(self, filename: str) -> dict:
+        """Loads the config file, reusing the cached config if unchanged.
+
+        The file is considered unchanged if its modified time and size are
+        the same as when it was parsed.
+
+        Params:
+            filename: the config filename
+
+        Returns:
+            the loaded config as a dictionary
+        """
+        if self.cache is None:
+            return self._load_method(filename)
+
+        stat = os.stat(filename)
+        key = os.path.abspath(filename)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        # moved to the end, the first files are the least recently used
+        cached = self.cache.pop(key, None)
+        if cached is None or cached[0] != signature:
+            logger.debug(f"Parsing {filename}, not in cache")
+            config = self._load_method(filename)
+            # merge modifies the config in place, a new copy is unpickled for every
+            # load, faster than copying the parsed objects
+            self.cache[key] = (signature, pickle.dumps(config, pickle.HIGHEST_PROTOCOL))
+        else:
+            self.cache[key] = cached
+            config = pickle.loads(cached[1])
+        while self.cache_size is not None and len(self.cache) > self.cache_size:
+            del self.cache[next(iter(self.cache))]
+        return config
+
+    def _iter_method(self, filename: str) -> Iterator[Tuple[Any, Any]]:
+        """Yields the top level (key, value) of the config file.
+
+        Parsers able to parse a file incrementally yield the keys as they are
+        parsed, by default the whole file is loaded first.
+
+        Params:
+            filename: the config filename
+
+        Returns:
+            generator of the top level (key, value)
+        """
+        yield from self._load_file(filename).items()
+
     @staticmethod
     def _search_match(name: str, check_list: Tuple[str]) -> bool:
         """Checks if the name is present in the ignored list.
@@ -125,32 +268,44 @@ class Parser:
             ignored: Tuple[str] = ("", ),
             keep: Tuple[str] = ("", ),
             merge_conflict: bool = True,
-            use_folder: bool = True):
+            use_folder: bool = True,
+            archive: Optional[ArchiveTree] = None,
+            select: Tuple[str] = ("", ),
+            key_path: Tuple[str, ...] = ()):
         """Joins config.
 
         Params:
             curr_config: the existing loaded config
-            filepath: file path to the new config to be loaded
+            filepath: file path to the new config to be loaded, can be a
+                zip/tar archive which is walked the same way as a folder
             ignore_keys: the folders that will not be use as keys
             ignored: list of file names to be ignored
             keep: list of file names to be kept, if not empty then load only these file names
             merge_conflict: if to merge the conflicts
             use_folder: if to use folder as key
+            archive: the opened archive filepath belongs to, if any
+            select: list of dotted key paths to be kept, folders and files that
+                cannot contain these keys are not read
+            key_path: the key path of curr_config within the loaded config
 
         Returns:
             updated config
         """
         # the current loaded filepath
-        logger.debug(f"{curr_config=}")
+        # lazy formatting, the config can be large
+        logger.debug("curr_config=%r", curr_config)
         logger.debug(f"{filepath=}")
         logger.debug(f"{ignore_keys=}")
         logger.debug(f"{ignored=}")
         logger.debug(f"{keep=}")
         logger.debug(f"{merge_conflict=}")
         logger.debug(f"{use_folder=}")
+        logger.debug(f"{select=}")
+        logger.debug(f"{key_path=}")
         # get the current filename and extension
         base_filename = os.path.basename(filepath)
-        filename, file_extension = os.path.splitext(base_filename)
+        # compressed config files are matched by the file extension before compression
+        filename, file_extension = os.path.splitext(split_compression(base_filename)[0])
         logger.debug(f"Joining {filename=} with {file_extension=}")
 
         assert isinstance(
@@ -163,7 +318,13 @@ class Parser:
             keep, tuple
         ), f"expected ignored as tuple, got {type(keep)}"
 
-        if self._search_match(filename, ignored):
+        if archive is None and is_archive(filepath):
+            # read the archive once, then walk its members like a folder
+            archive = ArchiveTree(filepath, [self], ignored=ignored, keep=keep)
+            # the archive name is the root folder, never a key
+            ignore_keys = ignore_keys + (base_filename, )
+
+        elif self._search_match(filename, ignored):
             # ignore the file if it's in the ignored list
             logger.debug(f"{filename} is in ignored list, ignored")
             return curr_config
@@ -175,20 +336,65 @@ class Parser:
 
         if file_extension == "." + self.extension:
             # load the file if it's of the config format
+            match = select_match(key_path, select)
+            if match is None:
+                logger.debug(f"{filepath} not in select list, ignored")
+                return curr_config
             logger.info(f"{'='*5} Reading {filepath}")
-            new_config = self._load_method(filepath)
-            curr_config = merge(curr_config, new_config, merge_conflict=merge_conflict)
+            schema = self.schema.at(key_path) if self.schema is not None else None
+            if self.schema is not None:
+                # violations are reported with the file the values came from
+                self.schema.source = filepath
+            if self.provenance is not None:
+                self.provenance.begin(filepath)
+            if archive is not None:
+                items = archive.load(filepath).items()
+            else:
+                items = self._iter_method(filepath)
+            # the file is merged into the store at once, a transaction per file
+            file_config: Dict[Any, Any] = {}
+            # merge the top level keys one at a time as they are parsed
+            for key, value in items:
+                # box the numbers of one top level value at a time at most
+                new_config = {key: compact(value, self.compact_lists)}
+                if not match:
+                    # keep only the selected top level keys
+                    new_config = select_config(new_config, select, key_path)
+                if self.store is not None:
+                    file_config.update(new_config)
+                    continue
+                curr_config = merge(
+                    curr_config, new_config, list(key_path),
+                    merge_conflict=merge_conflict, schema=schema, provenance=self.provenance)
+            if self.store is not None:
+                # only the folder keys are kept in memory
+                self.store.merge(
+                    file_config, key_path, merge_conflict=merge_conflict,
+                    schema=schema, provenance=self.provenance)
+
+        elif archive.isdir(filepath) if archive is not None else os.path.isdir(filepath):
+            # base folder will be used as the key
+            base_folder = os.path.basename(os.path.dirname(os.path.join(filepath, "")))
+            logger.debug(f"{base_folder=}")
+            if use_folder and base_folder not in ignore_keys:
+                folder_key_path = key_path + (base_folder, )
+            else:
+                folder_key_path = key_path
+            # skip the folder before listing if it cannot contain selected keys
+            match = select_match(folder_key_path, select)
+            if match is None:
+                logger.debug(f"{filepath} not in select list, ignored")
+                return curr_config
+            elif match:
+                # everything in the folder is selected
+                select = ("", )
 
-        elif os.path.isdir(filepath):
             # if the path is a folder, iteratively add the folder files
-            files = os.listdir(filepath)
+            files = archive.listdir(filepath) if archive is not None else os.listdir(filepath)
             # ensure files are in order
             files = sorted(files)
             for file in files:
                 new_path = os.path.join(filepath, file)
-                # base folder will be used as the key
-                base_folder = os.path.basename(os.path.dirname(new_path))
-                logger.debug(f"{base_folder=}")
                 # decide if to use folder as key
                 if use_folder and base_folder not in ignore_keys:
                     logger.debug(f"Using folder {base_folder} as key")
@@ -205,7 +411,10 @@ class Parser:
                     ignored=ignored,
                     keep=keep,
                     merge_conflict=merge_conflict,
-                    use_folder=use_folder
+                    use_folder=use_folder,
+                    archive=archive,
+                    select=select,
+                    key_path=folder_key_path
                 )
 
                 # add back the new config
@@ -213,6 +422,10 @@ class Parser:
                     curr_config[base_folder] = new_config
                 else:
                     curr_config = new_config
+
+            # ensure the archive name is not in configs
+            if archive is not None and filepath == archive.root:
+                curr_config.pop(base_filename, None)
         return curr_config
 
     def load(
@@ -220,6 +433,9 @@ class Parser:
         add_path: bool = False,
         replace: bool = False,
         ignore_keys: Tuple[str] = ("", ),
+        select: Tuple[str] = ("", ),
+        interpolate: bool = False,
+        schema: Union[dict, Schema, None] = None,
         *args, **kwargs
     ) -> Parser:
         """Loads the config (single, or multiple files, or dict).
@@ -229,12 +445,20 @@ class Parser:
 
             1. single config
             2. filepath for a folder of configs
-            3. dictionary containing the config itself
+            3. filepath for a zip/tar archive of configs
+            4. dictionary containing the config itself
 
             ignored: list of regex match strings to ignore in file names
             keep: list of regex match strings to keep (only)
             add_path: if to add the config filepath
             replace: if to replace the existing config
+            select: list of dotted key paths to keep, folders and files that
+            cannot contain these keys are skipped before reading
+            interpolate: if to resolve the `${path.to.key}` references once
+            loaded, see `genconfig.interpolate`
+            schema: JSON schema, or compiled `genconfig.schema.Schema`, the
+            values are checked against while merged, raises
+            `genconfig.schema.SchemaError` listing every violation
             other args will be passed to self.join
 
         Returns:
@@ -245,6 +469,14 @@ class Parser:
 
             multiple files: `load("config_folder")`
 
+            archive: `load("config_folder.tar.gz")`
+
+            selected keys: `load("config_folder", select=("function", "parameters.max_time"))`
+
+            references: `load("config_folder", interpolate=True)`
+
+            validated: `load("config_folder", schema={"required": ["name"]})`
+
             dictionary: `load({"name": "config"})
         """
         if config is not None:
@@ -267,7 +499,7 @@ class Parser:
         if replace:
             self.config = {}
 
-        filename, file_extension = os.path.splitext(config)
+        filename, file_extension = os.path.splitext(split_compression(config)[0])
         # if the config is a single config
         if file_extension == "." + self.extension:
             logger.info(f"{'='*5} Loading single file {config}")
@@ -279,20 +511,41 @@ class Parser:
         base_folder = os.path.basename(os.path.dirname(config))
         ignore_keys = ignore_keys + (base_folder, )
 
-        self.config = self.join(
-                self.config,
-                config,
-                ignore_keys=ignore_keys,
-                *args, **kwargs)
+        if schema is not None:
+            schema = Schema(schema, references=interpolate) if isinstance(
+                schema, dict) else schema.reset()
+            parser_schema, self.schema = self.schema, schema
+        try:
+            self.config = self.join(
+                    self.config,
+                    config,
+                    ignore_keys=ignore_keys,
+                    # selected keys can reference keys in any file
+                    select=select if not interpolate else ("", ),
+                    *args, **kwargs)
+        finally:
+            if schema is not None:
+                self.schema = parser_schema
 
         # ensure base folder is not in configs
         if base_folder in self.config:
             self.config.pop(base_folder)
 
+        if interpolate:
+            # references can point into any file, resolve once all are merged
+            self.config = resolve(self.config, schema if schema is not None else self.schema)
+
+        # remove the keys left by folders that had no selected keys
+        self.config = select_config(self.config, select)
+
+        if schema is not None:
+            # required keys can be in any file, checked once merged
+            schema.check(self.config)
+
         if add_path:
             self.config["config_path"] = config
 
-        logger.debug(f"Config after loading: {self.config}")
+        logger.debug("Config after loading: %s", self.config)
 
         return self
 
@@ -332,7 +585,7 @@ class Parser:
         self._write_method(filename)
 
         # restore config
-        self = self.load(self_config)
+        self.config = self_config
 
         return self
 
@@ -377,3 +630,146 @@ class Parser:
         parser.write(filename=filename, config=config)
 
         return self
+
+    @staticmethod
+    def _shard_name(key: Any) -> Optional[str]:
+        """Returns the key as a file or folder name, None if the key cannot be one.
+
+        Params:
+            key: the config key
+
+        Returns:
+            the name, None for non string keys and names which are not portable
+        """
+        if not isinstance(key, str) or key in ("", ".", "..") or key.startswith("."):
+            return None
+        if split_compression(key)[1]:
+            # would be read as a compressed file
+            return None
+        if re.search(r'[\\/:*?"<>|\x00-\x1f]', key):
+            return None
+        return key
+
+    def explode(
+        self,
+        folder: str,
+        config: Optional[dict] = None,
+        depth: int = 1,
+        formats: Optional[Dict[str, Parser]] = None,
+        workers: Optional[int] = None,
+        clean: bool = False,
+    ) -> Parser:
+        """Writes the config as a folder tree, the inverse of loading a folder.
+
+        Sub-dictionaries up to depth levels become folders named by their key,
+        every other key is written to its own file named by the key. Loading
+        the folder gives back the same config. Shards are written by a pool of
+        threads, shards whose content is unchanged are not written.
+
+        Params:
+            folder: the folder to be written to
+
+            config: the config, if not provided use config stored in object
+
+            depth: the number of folder levels, 0 writes a file per top level key
+
+            formats: parsers to be used for shards under a dotted key path,
+            the longest matching key path is used, else self
+
+            workers: the number of writer threads, defaults to the executor default
+
+            clean: if to remove config files and empty folders in folder which
+            are not part of the config
+
+        Returns:
+            self
+
+        Raises:
+            ValueError: if a top level key is named as the folder, it would be
+            dropped when loaded
+
+        Example:
+            `explode("config_folder", depth=2)`
+
+            `explode("config_folder", formats={"pipeline": YamlParser()})`
+        """
+        if config is None:
+            config = self.config
+        assert isinstance(folder, str), f"expected str got {type(folder)}"
+        assert isinstance(config, dict), f"expected dict got {type(config)}"
+        assert isinstance(depth, int) and depth >= 0, f"expected int >= 0 got {depth}"
+        # load drops the key named as the folder and does not use such folders as keys
+        folder_name = os.path.basename(os.path.abspath(folder))
+        if folder_name in config:
+            raise ValueError(
+                f"Cannot explode the key {folder_name} into {folder}, "
+                f"the key named as the folder is dropped when loaded")
+        formats = formats if formats is not None else {}
+        extensions = {"." + parser.extension for parser in formats.values()}
+        extensions.add("." + self.extension)
+
+        def write_shard(filename: str, text: str) -> bool:
+            # skip the shard if the file content is unchanged
+            if os.path.isfile(filename):
+                with open(filename, "r") as file:
+                    if file.read() == text:
+                        return False
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(filename, "w") as file:
+                file.write(text)
+            return True
+
+        def shards(
+                curr_config: Dict[Any, Any],
+                curr_folder: str,
+                key_path: Tuple[str, ...]) -> Iterator[Tuple[str, str]]:
+            filenames = set()
+            for key, value in curr_config.items():
+                name = self._shard_name(key)
+                new_path = key_path + (str(key), )
+                # folders named like a config file would be read as a file
+                if (len(key_path) < depth and name is not None and name != folder_name
+                        and isinstance(value, dict) and value
+                        and os.path.splitext(name)[1] not in extensions):
+                    yield from shards(value, os.path.join(curr_folder, name), new_path)
+                    continue
+
+                parser = self
+                for i in range(len(new_path), 0, -1):
+                    if ".".join(new_path[:i]) in formats:
+                        parser = formats[".".join(new_path[:i])]
+                        break
+                filename = None
+                if name is not None:
+                    filename = parser._append_extension(os.path.join(curr_folder, name))
+                if filename is None or filename in filenames:
+                    # keys are read from the file content, the name only has to be stable,
+                    # e.g. for the keys "a" and "a.json" both written to a.json
+                    name = "_" + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:12]
+                    filename = parser._append_extension(os.path.join(curr_folder, name))
+                filenames.add(filename)
+                # render in this thread, parsers are not thread safe
+                stream = io.StringIO()
+                type(parser)({key: value})._write_stream(stream)
+                yield filename, stream.getvalue()
+
+        written = set()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for filename, text in shards(config, folder, ()):
+                written.add(os.path.abspath(filename))
+                futures.append(executor.submit(write_shard, filename, text))
+            changed = sum(future.result() for future in futures)
+        logger.info(f"Wrote {changed} shards to {folder}, {len(futures) - changed} unchanged")
+
+        if clean and os.path.isdir(folder):
+            for root, dirs, files in os.walk(folder, topdown=False):
+                for file in files:
+                    filepath = os.path.abspath(os.path.join(root, file))
+                    if os.path.splitext(file)[1] in extensions and filepath not in written:
+                        logger.info(f"Removing {filepath}, not in config")
+                        os.remove(filepath)
+                if root != folder and not os.listdir(root):
+                    os.rmdir(root)
+
+        return self
@@ -5,23 +5,28 @@ import logging
 import json
 import sys
 import os
+from typing import Dict, List, Optional, Union
 
+from genconfig.archive import ArchiveTree, is_archive
+from genconfig.base_parser import Parser
+from genconfig.interpolate import resolve
+from genconfig.provenance import Provenance, index_path
+from genconfig.schema import Schema, SchemaError
 from genconfig.parsers import JsonParser, YamlParser
-from genconfig.utils import merge
+from genconfig.shared import publish
+from genconfig.store import SqliteStore
+from genconfig.utils import (
+    compact_kinds, flatten, merge, open_compressed, select_config, split_compression, to_builtin)
 
 
 logger = logging.getLogger(__name__)
 
 
-def entry(args):
-    """Command line interface entry point.
-
-    Example:
-        genconfig config.json
-    """
+def parse_args(args: List[str]) -> argparse.Namespace:
+    """Parses the command line arguments of a build."""
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "path", help="path to the config file/folder", type=str)
+        "path", help="path to the config file/folder/archive", type=str)
     parser.add_argument(
         "-o", "--output", help="path to save the loaded config", type=str)
     parser.add_argument(
@@ -58,13 +63,105 @@ def entry(args):
         nargs="*",
         help="which filetype to read", type=str, default=["*"]
     )
+    parser.add_argument(
+        "-s", "--select",
+        action="append",
+        help="""dotted key path to be kept, can be given multiple times, folders
+            and files that cannot contain the keys are not read, unless
+            --interpolate is given""", type=str
+    )
+    parser.add_argument(
+        "--flatten",
+        action="store_true",
+        help="""write the config as key=value lines with dotted keys, output
+            ending with .ndjson is always written as flattened json lines"""
+    )
+    parser.add_argument(
+        "-e", "--explode",
+        help="folder to write the loaded config as a folder tree", type=str
+    )
+    parser.add_argument(
+        "-ed", "--explode_depth",
+        help="number of folder levels when writing a folder tree", type=int, default=1
+    )
+    parser.add_argument(
+        "-ef", "--explode_format",
+        help="file type to write the folder tree files in", type=str, default="json"
+    )
+    parser.add_argument(
+        "-c", "--compression_level",
+        help="""compression level of the output, used when the output ends with
+            .gz, .xz or .bz2""", type=int
+    )
+    parser.add_argument(
+        "-p", "--publish",
+        help="path to publish the loaded config as a shared memory-mapped file", type=str
+    )
+    parser.add_argument(
+        "--compact",
+        choices=compact_kinds,
+        help="""store homogeneous numeric lists as arrays, numpy needs numpy
+            installed"""
+    )
+    parser.add_argument(
+        "--interpolate",
+        action="store_true",
+        help="""resolve ${path.to.key} references to other keys once the config
+            is merged, not supported with --store"""
+    )
+    parser.add_argument(
+        "--schema",
+        help="""JSON schema file (json or yml) the values are checked against
+            while merged, every violation is reported with its file""", type=str
+    )
+    parser.add_argument(
+        "--schema_fail_fast",
+        action="store_true",
+        help="stop at the first schema violation"
+    )
+    parser.add_argument(
+        "--provenance",
+        action="store_true",
+        help="""record the file every key was read from, written next to the
+            output for genconfig blame, requires -o"""
+    )
+    parser.add_argument(
+        "--store",
+        help="""SQLite file to merge the config into instead of memory, for
+            configs larger than memory, only string keys are supported""", type=str
+    )
     args = parser.parse_args(args)
+    if args.provenance and args.output is None:
+        parser.error("--provenance requires -o, the index is written next to the output")
+    return args
+
+
+def _merge(mega_config: Union[dict, SqliteStore], config: dict, **kwargs):
+    """Merges the config into the merged config dictionary or store."""
+    if isinstance(mega_config, SqliteStore):
+        mega_config.merge(config, **kwargs)
+    else:
+        merge(mega_config, config, **kwargs)
+
+
+def build(
+        args: argparse.Namespace,
+        config_parser_dict: Optional[Dict[str, Parser]] = None) -> Union[dict, SqliteStore]:
+    """Loads and merges the config described by the parsed arguments.
 
+    Params:
+        args: the parsed command line arguments
+        config_parser_dict: the parsers to use by file extension, new parsers
+            are initiated if not given
+
+    Returns:
+        the merged config, the store if `--store` is given
+    """
     # variables needed
     config_path = args.path
-    output_path = args.output
     ignored = tuple(args.ignored) if args.ignored else ("", )
     keep = tuple(args.keep) if args.keep else ("", )
+    select = tuple(args.select) if args.select else ("", )
     read_format = args.read
     use_folder = args.folder.lower()
     config_location = os.path.basename(os.path.dirname(config_path))
@@ -85,56 +182,76 @@ def entry(args):
             with open(path) as f:
                 append_dicts.append(json.loads(f.read()))
 
-    logging.basicConfig(
-        datefmt='%m/%d/%Y %I:%M:%S %p',
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=args.verbose
-    )
-    mega_config = {}
+    if args.store and args.interpolate:
+        raise ValueError(
+            "--interpolate needs the whole config in memory, not supported with --store")
+    # selected keys can reference keys in any file, selected once resolved
+    read_select = select if not args.interpolate else ("", )
+    # every file is merged into the store once parsed
+    mega_config = SqliteStore(args.store).clear() if args.store else {}
 
     # initiate parsers
-    config_parser_dict = {
-        "json": JsonParser(),
-        "yml": YamlParser()
-    }
+    if config_parser_dict is None:
+        config_parser_dict = new_parsers()
+    schema = None
+    if args.schema is not None:
+        schema_extension = os.path.splitext(split_compression(args.schema)[0])[1].replace(".", "")
+        schema_config = type(config_parser_dict[schema_extension])().load(args.schema).config
+        schema = Schema(
+            schema_config, fail_fast=args.schema_fail_fast, references=args.interpolate)
+    # one index shared by the parsers, keys are recorded in merge order
+    provenance = Provenance() if args.provenance else None
+    # written next to the output by save
+    args.provenance_index = provenance
+    for config_parser in config_parser_dict.values():
+        config_parser.compact_lists = args.compact
+        config_parser.schema = schema
+        config_parser.provenance = provenance
+        config_parser.store = mega_config if isinstance(mega_config, SqliteStore) else None
     if read_format == ["*"]:
         read_format = list(config_parser_dict.keys())
-    output_name, output_format = os.path.splitext(output_path)
-    output_format = output_format.replace(".", "")
     if use_folder in ["y", "yes", "true"]:
         use_folder = True
     else:
         use_folder = False
 
     logger.debug(f"{config_path=}")
-    logger.debug(f"{output_path=}")
     logger.debug(f"{ignored=}")
     logger.debug(f"{keep=}")
+    logger.debug(f"{select=}")
     logger.debug(f"{append_dict=}")
     logger.debug(f"{read_format=}")
     logger.debug(f"{use_folder=}")
     logger.debug(f"{ignore_keys=}")
 
     # load config by folder structure
-    file = [config_path]
-    if os.path.isdir(config_path):
+    archive = None
+    files = [config_path]
+    if is_archive(config_path):
+        # read the archive once for all parsers, then walk it as a folder
+        archive = ArchiveTree(
+            config_path, [config_parser_dict[x] for x in read_format],
+            ignored=ignored, keep=keep)
+        files = archive.listdir(config_path)
+        files = map(lambda x: os.path.join(config_path, x), files)
+    elif os.path.isdir(config_path):
         files = os.listdir(config_path)
         files = map(lambda x: os.path.join(config_path, x), files)
     # ensure files are sorted
     files = sorted(files)
     for file in files:
         logger.info(f"Reading file {file}")
-        filename, file_extension = os.path.splitext(file)
+        filename, file_extension = os.path.splitext(split_compression(file)[0])
         file_extension = file_extension.replace(".", "")
-        if os.path.isdir(file):
+        if archive.isdir(file) if archive is not None else os.path.isdir(file):
             # load folder
             logger.debug(f"Loading folder {file}")
             for parser_format in read_format:
                 config_parser = config_parser_dict[parser_format]
                 config = config_parser.load(
-                    config=file, ignored=ignored, keep=keep,
-                    use_folder=use_folder, ignore_keys=ignore_keys)
-                merge(mega_config, config.config)
+                    config=file, ignored=ignored, keep=keep, use_folder=use_folder,
+                    ignore_keys=ignore_keys, archive=archive, select=read_select)
+                _merge(mega_config, config.config)
         # before reading config file, check if file is in the read_format
         if file_extension in read_format:
             logger.debug(f"Using {file_extension} parser")
@@ -142,18 +259,180 @@ def entry(args):
             config_parser = config_parser_dict[file_extension]
             config = config_parser.load(
                 config=file, ignored=ignored, keep=keep, use_folder=use_folder,
-                ignore_keys=ignore_keys)
-            merge(mega_config, config.config)
+                ignore_keys=ignore_keys, archive=archive, select=read_select)
+            _merge(mega_config, config.config)
 
     # override the append dict
     for override_dict in append_dicts:
         logger.info(f"Override dictionary value with {override_dict}")
-        merge(mega_config, override_dict, merge_conflict=False, raise_conflict=False)
+        if schema is not None:
+            schema.source = "--append"
+        if provenance is not None and override_dict:
+            provenance.begin("--append")
+        _merge(mega_config, override_dict, merge_conflict=False, raise_conflict=False,
+               schema=schema.root if schema is not None else None, provenance=provenance)
+
+    if isinstance(mega_config, SqliteStore):
+        if schema is not None:
+            # only the keys described by the schema are read back for the required keys
+            schema.check({
+                key: mega_config[key] for key in schema.root.properties if key in mega_config})
+        return mega_config.select(select)
+    if args.interpolate:
+        # references can point into any file, resolve once all are merged
+        mega_config = resolve(mega_config, schema)
+    if schema is not None:
+        # required keys can be in any file, checked once merged
+        schema.check(mega_config)
+    return select_config(mega_config, select)
+
+
+def save(
+        mega_config: Union[dict, SqliteStore],
+        args: argparse.Namespace,
+        config_parser_dict: Optional[Dict[str, Parser]] = None):
+    """Writes and publishes the merged config as described by the parsed arguments.
+
+    Params:
+        mega_config: the merged config, or the store it was merged into
+        args: the parsed command line arguments
+        config_parser_dict: the parsers to use by file extension
+
+    Raises:
+        ValueError: if `--provenance` is given and args were not built by `build`
+    """
+    output_path = args.output
+    publish_path = args.publish
+    logger.debug(f"{output_path=}")
+    logger.debug(f"{publish_path=}")
+    if config_parser_dict is None:
+        config_parser_dict = new_parsers()
 
     # save config
     if output_path is not None:
+        output_name, output_format = os.path.splitext(split_compression(output_path)[0])
+        output_format = output_format.replace(".", "")
         logger.info(f"Writing config to {output_path}")
-        config_parser_dict[output_format].write(output_path, mega_config)
+        if output_format == "ndjson" or args.flatten:
+            write_flat(
+                mega_config, output_path, ndjson=output_format == "ndjson",
+                level=args.compression_level)
+        else:
+            output_parser = config_parser_dict[output_format]
+            output_parser.compression_level = args.compression_level
+            if isinstance(mega_config, SqliteStore):
+                # written one top level key at a time
+                mega_config.write(output_path, output_parser)
+            else:
+                output_parser.write(output_path, mega_config)
+
+    if isinstance(mega_config, SqliteStore) and (
+            args.explode is not None or publish_path is not None):
+        # the folder tree and the published file are written from the whole config
+        mega_config = mega_config.get("")
+
+    # write where every key was read from next to the output
+    provenance = getattr(args, "provenance_index", None)
+    if args.provenance and provenance is None:
+        raise ValueError("--provenance is recorded by build, save the args given to build")
+    if provenance is not None and output_path is not None:
+        logger.info(f"Writing provenance index to {index_path(output_path)}")
+        provenance.write(index_path(output_path))
+
+    # write config as folder tree
+    if args.explode is not None:
+        logger.info(f"Writing config to folder {args.explode}")
+        config_parser_dict[args.explode_format].explode(
+            args.explode, mega_config, depth=args.explode_depth)
+
+    # publish config for other processes
+    if publish_path is not None:
+        logger.info(f"Publishing config to {publish_path}")
+        publish(mega_config, publish_path)
+
+
+def write_flat(
+        mega_config: Union[dict, SqliteStore],
+        output_path: str,
+        ndjson: bool = False,
+        level: Optional[int] = None):
+    """Writes the config as one record per leaf value, with dotted keys.
+
+    Records are written as the config is walked, see `genconfig.utils.flatten`
+    for the key format. Values are json encoded.
+
+    Params:
+        mega_config: the merged config, or the store it was merged into
+        output_path: the file to be written
+        ndjson: if to write `{"key": ..., "value": ...}` json lines instead of
+            `key=value` lines
+        level: the compression level, if output_path ends with a compression
+            file extension
+    """
+    with open_compressed(output_path, "w", level) as file:
+        if isinstance(mega_config, SqliteStore):
+            # one top level value of the store in memory at a time
+            items = (
+                item for key, value in mega_config.top_items() for item in flatten({key: value}))
+        else:
+            items = flatten(mega_config)
+        for key, value in items:
+            if ndjson:
+                file.write(json.dumps({"key": key, "value": value}, default=to_builtin) + "\n")
+            else:
+                file.write(f"{key}={json.dumps(value, default=to_builtin)}\n")
+
+
+def new_parsers(cache: Optional[Dict[str, dict]] = None) -> Dict[str, Parser]:
+    """Initiates the parsers by file extension.
+
+    Params:
+        cache: parsed file caches by file extension, shared with the parsers
+
+    Returns:
+        the parsers by file extension
+    """
+    cache = cache if cache is not None else {}
+    return {
+        "json": JsonParser(cache=cache.get("json")),
+        "yml": YamlParser(cache=cache.get("yml"))
+    }
+
+
+def entry(args: List[str]):
+    """Command line interface entry point.
+
+    Example:
+        genconfig config.json
+
+        genconfig serve
+
+        genconfig convert config-json config-yml --to yml
+
+        genconfig blame parameters.num_nodes config.json
+    """
+    if args[:1] == ["serve"]:
+        from genconfig.daemon import serve_entry
+        return serve_entry(args[1:])
+    elif args[:1] == ["convert"]:
+        from genconfig.convert import convert_entry
+        return convert_entry(args[1:])
+    elif args[:1] == ["blame"]:
+        from genconfig.provenance import blame_entry
+        return blame_entry(args[1:])
+
+    args = parse_args(args)
+    logging.basicConfig(
+        datefmt='%m/%d/%Y %I:%M:%S %p',
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=args.verbose
+    )
+    config_parser_dict = new_parsers()
+    try:
+        mega_config = build(args, config_parser_dict)
+    except SchemaError as error:
+        sys.exit(str(error))
+    save(mega_config, args, config_parser_dict)
 
 
 def main():
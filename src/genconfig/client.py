@@ -0,0 +1,90 @@
+"""Thin command line client, builds with the genconfig daemon when it is running.
+
+Only the standard library is imported here so a build served by the daemon
+does not pay for importing and initiating the parsers.
+"""
+import getpass
+import json
+import os
+import socket
+import sys
+import tempfile
+from typing import List, Optional
+
+subcommands = ("serve", "convert", "blame")
+"""The commands handled in-process instead of sent to the daemon as a build."""
+
+
+def socket_path() -> str:
+    """Returns the daemon socket path, can be set with GENCONFIG_SOCKET.
+
+    Defaults to $XDG_RUNTIME_DIR, else to a folder of the user in the
+    temporary folder, created by the daemon only accessible to the user.
+    """
+    if "GENCONFIG_SOCKET" in os.environ:
+        return os.environ["GENCONFIG_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "genconfig.sock")
+    return os.path.join(tempfile.gettempdir(), f"genconfig-{getpass.getuser()}", "genconfig.sock")
+
+
+def owned(path: str) -> bool:
+    """Checks the path belongs to the current user, False if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return not hasattr(os, "getuid") or stat.st_uid == os.getuid()
+
+
+def request(args: List[str], path: Optional[str] = None) -> Optional[dict]:
+    """Sends the build command line arguments to the daemon.
+
+    Params:
+        args: the command line arguments, relative paths are resolved against
+            the current working directory
+        path: the daemon socket path, defaults to `socket_path()`
+
+    Returns:
+        the daemon response, None if the daemon is not available or the
+        socket is not owned by the current user
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = path if path is not None else socket_path()
+    if not owned(path):
+        # never send the build to a socket another user could have created
+        return None
+    message = json.dumps({"args": args, "cwd": os.getcwd()}).encode("utf-8") + b"\n"
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(path)
+            conn.sendall(message)
+            with conn.makefile("rb") as file:
+                response = file.readline()
+    except OSError:
+        return None
+    if not response:
+        # daemon went away during the build
+        return None
+    return json.loads(response)
+
+
+def main():
+    """Main entry point, falls back to building in-process without a daemon."""
+    args = sys.argv[1:]
+    # sub-commands and help messages are always handled in-process
+    if not (args and args[0] in subcommands) and not {"-h", "--help"} & set(args):
+        response = request(args)
+        if response is not None:
+            if response["status"] != "ok":
+                sys.exit(f"genconfig daemon: {response['error']}")
+            return
+
+    from genconfig.cli import main as cli_main
+    return cli_main()
+
+
+if __name__ == "__main__":
+    main()
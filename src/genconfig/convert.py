@@ -0,0 +1,144 @@
+"""Converts a whole folder tree of configs into another file type."""
+import argparse
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from genconfig.parsers import parser_list
+from genconfig.utils import split_compression
+
+logger = logging.getLogger(__name__)
+
+
+def _convert_file(config_path: str, filename: str, extension: str):
+    """Converts a single config file, run in the worker processes."""
+    parsers = {parser.extension: parser for parser in parser_list}
+    config_extension = os.path.splitext(split_compression(config_path)[0])[1].replace(".", "")
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    if config_extension == extension:
+        # same file type, keep the file as it is
+        shutil.copyfile(config_path, filename)
+    else:
+        # read and write the file as it is, load would drop keys named as the folder
+        config = parsers[config_extension]()._load_method(config_path)
+        parsers[extension](config)._write_method(filename)
+
+
+def _plan(src_folder: str, dst_folder: str, extension: str) -> List[Tuple[str, str]]:
+    """Returns the (config path, output path) of every config file in src_folder."""
+    extensions = {"." + parser.extension for parser in parser_list}
+    plan = []
+    outputs = set()
+    for root, dirs, files in os.walk(src_folder):
+        dirs.sort()
+        # files already of the output type keep their name
+        files = sorted(files, key=lambda x: not split_compression(x)[0].endswith("." + extension))
+        for file in files:
+            # compressed files stay compressed with the same codec
+            name, compression = split_compression(file)
+            filename, file_extension = os.path.splitext(name)
+            if file_extension not in extensions:
+                continue
+            output_folder = os.path.join(dst_folder, os.path.relpath(root, src_folder))
+            output_name = f"{filename}.{extension}{compression}"
+            output_path = os.path.normpath(os.path.join(output_folder, output_name))
+            if output_path in outputs:
+                # e.g. config.json and config.yml, keep both as config.json.yml
+                output_name = f"{name}.{extension}{compression}"
+                output_path = os.path.normpath(os.path.join(output_folder, output_name))
+                logger.warning(f"{file} has the same name as another file, writing {output_path}")
+            outputs.add(output_path)
+            plan.append((os.path.join(root, file), output_path))
+    return plan
+
+
+def convert_tree(
+        src_folder: str,
+        dst_folder: str,
+        extension: str,
+        workers: Optional[int] = None) -> Dict[str, float]:
+    """Mirrors a folder of configs into another folder, converting every config file.
+
+    Files are converted by a pool of processes, each file is read and written
+    with the parser methods so its content is kept as it is. Files
+    whose output is newer than the config file are skipped.
+
+    Params:
+        src_folder: the folder of configs
+        dst_folder: the folder to be written to
+        extension: the file type to convert to, e.g. "yml"
+        workers: the number of worker processes, defaults to the number of CPUs
+
+    Returns:
+        the number of converted and skipped files, the seconds taken and the
+        converted files per second
+
+    Example:
+        `convert_tree("config-json", "config-yml", "yml")`
+    """
+    assert os.path.isdir(src_folder), f"expected folder got {src_folder}"
+    extensions = [parser.extension for parser in parser_list]
+    assert extension in extensions, f"expected one of {extensions} got {extension}"
+
+    start = time.perf_counter()
+    plan = _plan(src_folder, dst_folder, extension)
+    pending = [
+        (config_path, output_path) for config_path, output_path in plan
+        if not os.path.exists(output_path)
+        or os.path.getmtime(output_path) < os.path.getmtime(config_path)
+    ]
+    skipped = len(plan) - len(pending)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_convert_file, config_path, output_path, extension)
+                for config_path, output_path in pending
+            ]
+            for future in futures:
+                future.result()
+
+    seconds = time.perf_counter() - start
+    files_per_second = len(pending) / seconds if seconds > 0 else 0.0
+    logger.info(
+        f"Converted {len(pending)} files in {seconds:.2f}s ({files_per_second:.1f} files/s), "
+        f"skipped {skipped} up to date files")
+    return {
+        "converted": len(pending),
+        "skipped": skipped,
+        "seconds": seconds,
+        "files_per_second": files_per_second,
+    }
+
+
+def convert_entry(args: List[str]):
+    """Command line interface of the folder conversion.
+
+    Example:
+        genconfig convert config-json config-yml --to yml
+    """
+    parser = argparse.ArgumentParser(prog="genconfig convert")
+    parser.add_argument(
+        "src", help="path to the config folder", type=str)
+    parser.add_argument(
+        "dst", help="path to write the converted config folder", type=str)
+    parser.add_argument(
+        "-t", "--to",
+        help="file type to convert to", type=str, required=True)
+    parser.add_argument(
+        "-w", "--workers",
+        help="number of worker processes", type=int)
+    parser.add_argument(
+        "-v", "--verbose",
+        help="debug level", type=str, default="INFO")
+    args = parser.parse_args(args)
+
+    logging.basicConfig(
+        datefmt='%m/%d/%Y %I:%M:%S %p',
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=args.verbose
+    )
+    convert_tree(args.src, args.dst, args.to, workers=args.workers)
@@ -0,0 +1,179 @@
+"""Long running genconfig daemon serving builds over a Unix domain socket.
+
+The daemon keeps the parsed config files and the merged config of every build
+in memory. Parsed files are reused while their modified time and size are
+unchanged, a merged config is reused while none of the files and folders it
+was built from changed. Builds are served one at a time.
+
+Protocol, one json line each way:
+
+    request:  {"args": [command line arguments], "cwd": working directory}
+    response: {"status": "ok"} or {"status": "error", "error": message}
+"""
+import argparse
+import json
+import logging
+import os
+import socketserver
+import stat
+from typing import Any, Dict, List, Tuple
+
+from genconfig.cli import build, new_parsers, parse_args, save
+from genconfig.client import owned, socket_path
+
+logger = logging.getLogger(__name__)
+
+
+def _signature(paths: List[str]) -> Tuple[Tuple[str, int, int], ...]:
+    """Returns the (path, modified time, size) of every file and folder under paths."""
+    stats = []
+    for path in paths:
+        stat = os.stat(path)
+        stats.append((path, stat.st_mtime_ns, stat.st_size))
+        for root, dirs, files in os.walk(path):
+            for name in dirs + files:
+                filepath = os.path.join(root, name)
+                stat = os.stat(filepath)
+                stats.append((filepath, stat.st_mtime_ns, stat.st_size))
+    return tuple(stats)
+
+
+class BuildHandler(socketserver.StreamRequestHandler):
+    """Handles a single build request."""
+
+    def handle(self):
+        """Runs the build and responds with the status."""
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+            self.server.handle_build(message["args"], message["cwd"])
+            response = {"status": "ok"}
+        except (Exception, SystemExit) as error:
+            # argparse exits on invalid arguments, report it instead
+            logger.exception("Build failed")
+            response = {"status": "error", "error": f"{type(error).__name__}: {error}"}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class BuildServer(socketserver.UnixStreamServer):
+    """Unix socket server keeping parsed files and merged configs warm."""
+
+    def __init__(self, path: str, max_builds: int = 16, max_fragments: int = 10000):
+        """Binds the server to the socket path.
+
+        Params:
+            path: the Unix domain socket path
+            max_builds: the number of merged configs kept, the least recently
+                used are evicted
+            max_fragments: the number of parsed files kept per file extension
+        """
+        self.fragments: Dict[str, dict] = {"json": {}, "yml": {}}
+        """The parsed file caches by file extension."""
+        self.builds: Dict[Tuple[Any, ...], Tuple[Tuple[Any, ...], dict]] = {}
+        """The merged config and its file signature by build arguments."""
+        self.max_builds = max_builds
+        """The number of merged configs kept."""
+        self.max_fragments = max_fragments
+        """The number of parsed files kept per file extension."""
+        super().__init__(path, BuildHandler)
+
+    def handle_build(self, args: List[str], cwd: str):
+        """Builds, writes and publishes the config.
+
+        Params:
+            args: the command line arguments
+            cwd: the client working directory
+        """
+        logger.info(f"Build {args} in {cwd}")
+        options = parse_args(args)
+        previous_cwd = os.getcwd()
+        os.chdir(cwd)
+        try:
+            # output options do not change the merged config
+            key = (cwd, ) + tuple(
+                (name, repr(value)) for name, value in sorted(vars(options).items())
+                if name not in ("output", "publish", "verbose"))
+            paths = [options.path] + list(options.append_path or [])
+            if options.schema is not None:
+                paths.append(options.schema)
+            signature = _signature(paths)
+            config_parser_dict = new_parsers(self.fragments)
+            for config_parser in config_parser_dict.values():
+                config_parser.cache_size = self.max_fragments
+
+            # moved to the end, the first builds are the least recently used
+            cached = self.builds.pop(key, None)
+            if cached is not None and cached[0] == signature:
+                logger.info("Files unchanged, reusing merged config")
+                mega_config = cached[1]
+                self.builds[key] = cached
+            else:
+                mega_config = build(options, config_parser_dict)
+                # the store and the provenance index are rebuilt every time
+                if options.store is None and not options.provenance:
+                    self.builds[key] = (signature, mega_config)
+            while len(self.builds) > self.max_builds:
+                del self.builds[next(iter(self.builds))]
+            save(mega_config, options, config_parser_dict)
+            if options.store is not None:
+                # do not keep the store file open
+                mega_config.close()
+        finally:
+            os.chdir(previous_cwd)
+
+
+def serve(path: str):
+    """Serves builds on the socket path until interrupted.
+
+    Params:
+        path: the Unix domain socket path
+
+    Raises:
+        PermissionError: if the socket folder or socket belongs to another user
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(dirname):
+        # only the user can reach the socket
+        os.makedirs(dirname, mode=0o700)
+    if not owned(dirname) and not os.stat(dirname).st_mode & stat.S_ISVTX:
+        # e.g. the per user folder created beforehand by another user, sticky
+        # folders such as /tmp do not let other users replace the socket
+        raise PermissionError(f"{dirname} belongs to another user")
+    if os.path.lexists(path) and not owned(path):
+        raise PermissionError(f"{path} belongs to another user")
+    if os.path.exists(path):
+        # remove the socket left behind by a previous daemon
+        os.unlink(path)
+    with BuildServer(path) as server:
+        logger.info(f"Serving genconfig builds on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stopping genconfig daemon")
+        finally:
+            os.unlink(path)
+
+
+def serve_entry(args: List[str]):
+    """Command line interface of the daemon.
+
+    Example:
+        genconfig serve --socket /tmp/genconfig.sock
+    """
+    parser = argparse.ArgumentParser(prog="genconfig serve")
+    parser.add_argument(
+        "-s", "--socket",
+        help="path of the Unix domain socket", type=str, default=socket_path())
+    parser.add_argument(
+        "-v", "--verbose",
+        help="debug level", type=str, default="INFO")
+    args = parser.parse_args(args)
+
+    logging.basicConfig(
+        datefmt='%m/%d/%Y %I:%M:%S %p',
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=args.verbose
+    )
+    serve(args.socket)
@@ -0,0 +1,200 @@
+"""Resolves `${path.to.key}` references between the values of a config.
+
+A string that is a single reference is replaced by a copy of the referenced
+value, which can be a sub-dictionary. References within a longer string are
+replaced by the referenced value as text. `$${...}` is kept as `${...}`.
+
+References are resolved depth first, the referenced key is resolved with
+everything under it before its value is used, so the resolution follows the
+topological order of the references. Every resolved key is remembered and
+resolved only once, a reference back to a key being resolved is a cycle.
+"""
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import re
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Set, Tuple, Union
+
+from genconfig.utils import is_list, to_builtin
+
+if TYPE_CHECKING:  # pragma: no cover
+    from genconfig.schema import Schema
+
+logger = logging.getLogger(__name__)
+
+_reference = re.compile(r"\$(\$?)\{([^}]*)\}")
+_missing = object()
+
+Key = Union[str, Sequence[Any]]
+
+
+def _key_parts(key: Key) -> Tuple[str, ...]:
+    """Returns the parts of a dotted key or a sequence of keys."""
+    if isinstance(key, str):
+        return tuple(key.split(".")) if key else ()
+    return tuple(str(part) for part in key)
+
+
+def _child_key(container: Any, part: str) -> Any:
+    """Returns the key of the container child named part, raises KeyError if there is none."""
+    if isinstance(container, dict):
+        if part in container:
+            return part
+        # keys read as other types, e.g. yaml integer keys
+        for key in container:
+            if str(key) == part:
+                return key
+    elif is_list(container) and part.isdigit() and int(part) < len(container):
+        return int(part)
+    raise KeyError(part)
+
+
+class Resolver:
+    """Resolves the references of a config in place.
+
+    Example:
+        `Resolver({"a": 1, "b": "${a}"}).resolve()` -> {"a": 1, "b": 1}
+
+        only the keys read are resolved: `Resolver(config).get("function.function1")`
+    """
+
+    def __init__(self, config: Dict[Any, Any], schema: Optional["Schema"] = None):
+        """Initiate the resolver of the config.
+
+        Params:
+            config: the config to be resolved, modified in place
+            schema: the compiled schema the resolved values are checked against
+        """
+        assert isinstance(config, dict), f"expected dict got {type(config)}"
+        self.config = config
+        """The config being resolved."""
+        self.schema = schema
+        """The compiled schema the resolved values are checked against."""
+        self._resolved: Set[Tuple[str, ...]] = set()
+        self._resolving: Dict[Tuple[str, ...], None] = {}
+
+    def _resolve_at(self, parts: Tuple[str, ...], parent: Any, key: Any) -> Any:
+        """Resolves the value parent[key] at the key path parts and everything under it."""
+        value = parent[key]
+        if any(parts[:depth] in self._resolved for depth in range(len(parts), 0, -1)):
+            # also the values copied by a reference, they are resolved with their source
+            return value
+        if parts in self._resolving:
+            cycle = list(self._resolving)[list(self._resolving).index(parts):] + [parts]
+            raise ValueError(
+                f"Reference cycle {' -> '.join('.'.join(path) for path in cycle)}")
+
+        self._resolving[parts] = None
+        if isinstance(value, str) and "${" in value:
+            # the referenced values are already resolved
+            value = self._substitute(value, parts)
+            parent[key] = value
+            self._resolved.add(parts)
+            node = self.schema.at(parts) if self.schema is not None else None
+            if node is not None:
+                # the value no longer comes from a single file
+                self.schema.source = None
+                node.validate(value, list(parts))
+        elif isinstance(value, dict):
+            for child in list(value):
+                self._resolve_at(parts + (str(child), ), value, child)
+            self._resolved.add(parts)
+        elif is_list(value):
+            for index in range(len(value)):
+                self._resolve_at(parts + (str(index), ), value, index)
+            self._resolved.add(parts)
+        del self._resolving[parts]
+        return value
+
+    def _lookup(self, parts: Tuple[str, ...]) -> Any:
+        """Returns the resolved value at the key path, raises KeyError if not present."""
+        if not parts:
+            raise KeyError("")
+        container = self.config
+        for depth, part in enumerate(parts[:-1]):
+            child = _child_key(container, part)
+            value = container[child]
+            if isinstance(value, str) and "${" in value:
+                # a reference on the way can resolve into a sub-dictionary
+                value = self._resolve_at(parts[:depth + 1], container, child)
+            container = value
+        return self._resolve_at(parts, container, _child_key(container, parts[-1]))
+
+    def _substitute(self, value: str, parts: Tuple[str, ...]) -> Any:
+        """Replaces the references in the string value at the key path parts."""
+        def lookup(reference: str) -> Any:
+            try:
+                return self._lookup(_key_parts(reference))
+            except KeyError:
+                raise ValueError(
+                    f"Unknown reference ${{{reference}}} at {'.'.join(parts)}") from None
+
+        match = _reference.fullmatch(value)
+        if match is not None and not match.group(1):
+            logger.debug(f"Resolving {match.group(2)} at {'.'.join(parts)}")
+            # copy sub-dictionaries, yaml would otherwise write aliases
+            return copy.deepcopy(lookup(match.group(2)))
+
+        def replace(match: re.Match) -> str:
+            if match.group(1):
+                return "${" + match.group(2) + "}"
+            referenced = lookup(match.group(2))
+            if isinstance(referenced, dict) or is_list(referenced):
+                raise ValueError(
+                    f"Cannot interpolate ${{{match.group(2)}}} into a string "
+                    f"at {'.'.join(parts)}, it is not a single value")
+            if isinstance(referenced, str):
+                return referenced
+            return json.dumps(referenced, default=to_builtin)
+
+        return _reference.sub(replace, value)
+
+    def get(self, key: Key, default: Any = None) -> Any:
+        """Resolves and returns the value of a key, nothing else is resolved.
+
+        Params:
+            key: dotted key path, or sequence of keys, empty for the whole config
+            default: returned if the key is not present
+
+        Returns:
+            the resolved config value
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __getitem__(self, key: Key) -> Any:
+        """Resolves and returns the value of a key, raises KeyError if not present."""
+        parts = _key_parts(key)
+        if not parts:
+            return self.resolve()
+        return self._lookup(parts)
+
+    def resolve(self) -> Dict[Any, Any]:
+        """Resolves every reference of the config.
+
+        Returns:
+            the resolved config
+
+        Raises:
+            ValueError: if a reference is unknown or part of a cycle
+        """
+        for key in list(self.config):
+            self._resolve_at((str(key), ), self.config, key)
+        return self.config
+
+
+def resolve(config: Dict[Any, Any], schema: Optional["Schema"] = None) -> Dict[Any, Any]:
+    """Resolves every `${path.to.key}` reference of the config in place.
+
+    Params:
+        config: the config to be resolved
+        schema: the compiled schema the resolved values are checked against
+
+    Example:
+        `resolve({"a": {"b": 1}, "c": "${a}"})` -> {"a": {"b": 1}, "c": {"b": 1}}
+    """
+    return Resolver(config, schema).resolve()
@@ -1,23 +1,180 @@
 import json
+import os
+from typing import IO, Any, Dict, Iterable, Iterator, Tuple
+
 from genconfig.base_parser import Parser
+from genconfig.utils import open_compressed, split_compression, to_builtin
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+_whitespace = " \t\n\r"
+
+
+class _ObjectReader:
+    """Reads a json object from a text stream one chunk at a time."""
+
+    def __init__(self, stream: IO[str], chunk_size: int):
+        """Reads from the stream chunk_size characters at a time."""
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        # share the key strings between values, as json.loads does for a whole document
+        keys: Dict[str, str] = {}
+        self.decoder = json.JSONDecoder(
+            object_pairs_hook=lambda pairs: {keys.setdefault(k, k): v for k, v in pairs})
+
+    def _read(self):
+        """Drops the consumed text and appends the next chunk.
+
+        The chunk grows with the pending text so a value spanning many chunks
+        is decoded a logarithmic number of times.
+        """
+        pending = self.buffer[self.position:]
+        chunk = self.stream.read(max(self.chunk_size, len(pending)))
+        self.eof = not chunk
+        self.buffer, self.position = pending + chunk, 0
+
+    def peek(self) -> str:
+        """Returns the next non whitespace character, empty at end of stream."""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in _whitespace:
+                self.position += 1
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+            self._read()
+
+    def expect(self, characters: str) -> str:
+        """Consumes the next non whitespace character, it has to be one of characters."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r} got {character!r}")
+        self.position += 1
+        return character
+
+    def decode(self) -> Any:
+        """Decodes the next json value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._read()
+                continue
+            # a number at the end of the buffer may continue in the next chunk
+            if end < len(self.buffer) or self.eof:
+                self.position = end
+                return value
+            self._read()
+
+
+def _iter_stream(stream: IO[str], chunk_size: int) -> Iterator[Tuple[str, Any]]:
+    """Yields the top level (key, value) of a json object, pure python fallback."""
+    reader = _ObjectReader(stream, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected a string key got {key!r}")
+        reader.expect(":")
+        yield key, reader.decode()
+        if reader.expect(",}") == "}":
+            return
+
+
+def iter_items(filename: str, chunk_size: int = 1 << 20) -> Iterator[Tuple[str, Any]]:
+    """Yields the top level (key, value) of a json config file as they are read.
+
+    Only the text of the current top level value is held in memory. Uses
+    the ijson event parser if installed, else decodes chunks of the file with
+    the standard json decoder.
+
+    Params:
+        filename: the json config file
+        chunk_size: the number of characters read at a time by the fallback
+
+    Returns:
+        generator of the top level (key, value)
+
+    Example:
+        `dict(iter_items("config.json"))`
+    """
+    if ijson is not None:
+        with open_compressed(filename, "rb") as file:
+            yield from ijson.kvitems(file, "", use_float=True)
+    else:
+        with open_compressed(filename, "r") as file:
+            yield from _iter_stream(file, chunk_size)
 
 
 class JsonParser(Parser):
     """Json parser."""
     extension = "json"
 
+    stream_size: int = 64 * 1024 * 1024
+    """Files of at least this many bytes are parsed incrementally, compressed files always."""
+
+    def _streamed(self, filename: str) -> bool:
+        """Checks if the file is parsed incrementally.
+
+        The size of a compressed file is not the size of its text, they are
+        always parsed incrementally.
+        """
+        return bool(split_compression(filename)[1]) or os.path.getsize(filename) >= self.stream_size
+
     def _write_method(self, filename: str) -> Parser:
         filename = self._append_extension(filename)
 
-        with open(filename, "w") as file:
-            json.dump(self.config, file, indent=4)
+        with open_compressed(filename, "w", self.compression_level) as file:
+            self._write_stream(file)
+
+        return self
+
+    def _write_stream(self, stream: IO[str]) -> Parser:
+        json.dump(self.config, stream, indent=4, default=to_builtin)
+
+        return self
+
+    def _write_items(self, stream: IO[str], items: Iterable[Tuple[Any, Any]]) -> Parser:
+        # same text as json.dump, written one top level value at a time
+        stream.write("{")
+        separator = ""
+        for key, value in items:
+            text = json.dumps({key: value}, indent=4, default=to_builtin)
+            stream.write(separator + text[1:-2])
+            separator = ","
+        stream.write("\n}" if separator else "}")
 
         return self
 
     def _load_method(self, filename: str) -> dict:
         filename = self._append_extension(filename)
 
-        with open(filename, "r") as json_config:
-            config = json.loads(json_config.read())
+        if self._streamed(filename):
+            # never hold the whole file text in memory
+            return dict(iter_items(filename))
+
+        with open_compressed(filename, "r") as json_config:
+            config = self._load_stream(json_config)
 
         return config
+
+    def _load_stream(self, stream: IO[str]) -> dict:
+        return json.loads(stream.read())
+
+    def _iter_method(self, filename: str) -> Iterator[Tuple[Any, Any]]:
+        filename = self._append_extension(filename)
+
+        if self._streamed(filename):
+            # large files are not cached, merge the keys as they are parsed
+            yield from iter_items(filename)
+        else:
+            yield from super()._iter_method(filename)
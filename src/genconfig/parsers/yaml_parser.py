@@ -1,5 +1,9 @@
+import array
+from typing import IO, Any, Iterable, Tuple
+
 from ruamel.yaml import YAML
 from genconfig.base_parser import Parser
+from genconfig.utils import numpy, open_compressed
 
 
 class YamlParser(Parser):
@@ -8,20 +12,41 @@ class YamlParser(Parser):
 
     _yaml = YAML()
     _yaml.indent(mapping=2, sequence=4, offset=2)
+    # arrays of compacted configs are written as lists
+    _yaml.representer.add_representer(
+        array.array, lambda representer, data: representer.represent_list(data.tolist()))
+    if numpy is not None:
+        _yaml.representer.add_representer(
+            numpy.ndarray, lambda representer, data: representer.represent_list(data.tolist()))
 
     def _write_method(self, filename: str) -> Parser:
         # check if the given path ends with a yaml file extension
         filename = self._append_extension(filename)
 
-        with open(filename, "w") as file:
-            self._yaml.dump(self.config, file)
+        with open_compressed(filename, "w", self.compression_level) as file:
+            self._write_stream(file)
+
+        return self
+
+    def _write_stream(self, stream: IO[str]) -> Parser:
+        self._yaml.dump(self.config, stream)
+
+        return self
+
+    def _write_items(self, stream: IO[str], items: Iterable[Tuple[Any, Any]]) -> Parser:
+        # consecutive single key mappings read back as one mapping
+        for key, value in items:
+            self._yaml.dump({key: value}, stream)
 
         return self
 
     def _load_method(self, filename: str) -> dict:
         filename = self._append_extension(filename)
 
-        with open(filename, "r") as file:
-            config = self._yaml.load(file.read())
+        with open_compressed(filename, "r") as file:
+            config = self._load_stream(file)
 
         return config
+
+    def _load_stream(self, stream: IO[str]) -> dict:
+        return self._yaml.load(stream.read())
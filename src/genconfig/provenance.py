@@ -0,0 +1,178 @@
+"""Records which config file supplied every key, and answers `genconfig blame`.
+
+`genconfig.utils.merge` records a change only where it happens: a key
+inserted with its whole sub-dictionary, a list extended, a conflict or an
+override. The sources of a leaf are the records on its key path, from the top
+level key down to the leaf, so recording costs one trie insertion per change
+instead of one per leaf. File names are interned, records are
+(file id, merge order, change) integers in a trie of the key paths.
+
+The index is written next to the output as json:
+`{"files": [...], "trie": [records, {key: node}]}` with the records flattened.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from genconfig.utils import open_compressed
+
+changes = ("set", "append", "conflict", "override")
+"""The recorded changes, stored by index."""
+
+suffix = ".provenance"
+"""The file extension of the sidecar index, appended to the output path."""
+
+
+class _Node:
+    """A key path in the trie, with the records of changes at the key path."""
+
+    __slots__ = ("records", "children")
+
+    def __init__(self):
+        self.records: List[int] = []
+        self.children: Dict[str, _Node] = {}
+
+
+class Provenance:
+    """Index of the config file and merge order of every change by key path.
+
+    Example:
+        `parser.provenance = Provenance()`, then `parser.provenance.blame("name")`
+    """
+
+    def __init__(self):
+        """Initiate an empty index."""
+        self.files: List[str] = []
+        """The interned file names, by file id."""
+        self._file_ids: Dict[str, int] = {}
+        self._root = _Node()
+        self._file_id = -1
+        self._order = -1
+
+    def begin(self, filename: str):
+        """Starts recording the changes merged from a config file, set by `Parser.join`."""
+        self._file_id = self._file_ids.setdefault(filename, len(self.files))
+        if self._file_id == len(self.files):
+            self.files.append(filename)
+        self._order += 1
+
+    def record(self, path: Sequence[str], change: str):
+        """Records a change at the key path, by the current config file.
+
+        Params:
+            path: the key path of the change
+            change: one of `changes`
+        """
+        if self._file_id < 0:
+            # merged without a config file, e.g. appended dictionaries
+            return
+        node = self._root
+        for key in path:
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = _Node()
+            node = child
+        node.records.extend((self._file_id, self._order, changes.index(change)))
+
+    def _node(self, path: Sequence[str]) -> Tuple[List[Tuple[str, _Node]], Optional[_Node]]:
+        """Returns the (dotted key, node) of the ancestors and the node of the key path."""
+        ancestors: List[Tuple[str, _Node]] = []
+        node: Optional[_Node] = self._root
+        for depth, key in enumerate(path):
+            ancestors.append((".".join(path[:depth]), node))
+            node = node.children.get(key)
+            if node is None:
+                break
+        return ancestors, node
+
+    def blame(self, key: str) -> List[Tuple[int, str, str, str]]:
+        """Returns the changes of a key, its parents and, for a sub-dictionary, its sub-keys.
+
+        Params:
+            key: the dotted key path
+
+        Returns:
+            (merge order, dotted key, change, config file) sorted by merge order
+
+        Example:
+            `blame("parameters.num_nodes")` -> [(2, "parameters", "set", "config/parameters.json")]
+        """
+        path = key.split(".") if key else []
+        ancestors, node = self._node(path)
+        found: List[Tuple[str, _Node]] = [(dotted, ancestor) for dotted, ancestor in ancestors]
+        stack = [(key, node)] if node is not None else []
+        while stack:
+            dotted, current = stack.pop()
+            found.append((dotted, current))
+            for child_key, child in current.children.items():
+                stack.append((f"{dotted}.{child_key}" if dotted else child_key, child))
+
+        blamed = []
+        for dotted, current in found:
+            records = current.records
+            for index in range(0, len(records), 3):
+                file_id, order, change = records[index:index + 3]
+                blamed.append((order, dotted, changes[change], self.files[file_id]))
+        return sorted(blamed)
+
+    def _dump(self, node: _Node) -> List[Any]:
+        """Returns the json form of a node, [records] or [records, children]."""
+        if not node.children:
+            return [node.records]
+        return [node.records, {key: self._dump(child) for key, child in node.children.items()}]
+
+    def write(self, filename: str):
+        """Writes the index, compressed if filename ends with a compression file extension."""
+        with open_compressed(filename, "w") as file:
+            json.dump({"files": self.files, "trie": self._dump(self._root)},
+                      file, separators=(",", ":"))
+
+    @classmethod
+    def read(cls, filename: str) -> Provenance:
+        """Reads an index written by `write`."""
+        with open_compressed(filename, "r") as file:
+            index = json.load(file)
+        provenance = cls()
+        provenance.files = index["files"]
+        provenance._file_ids = {name: file_id for file_id, name in enumerate(provenance.files)}
+
+        stack: List[Tuple[List[Any], _Node]] = [(index["trie"], provenance._root)]
+        while stack:
+            dumped, node = stack.pop()
+            node.records = dumped[0]
+            for key, child in (dumped[1].items() if len(dumped) > 1 else ()):
+                node.children[key] = _Node()
+                stack.append((child, node.children[key]))
+        return provenance
+
+
+def index_path(path: str) -> str:
+    """Returns the sidecar index path of an output, an index path is returned as is."""
+    return path if path.endswith(suffix) else path + suffix
+
+
+def blame_entry(args: List[str]):
+    """Command line interface of the key provenance.
+
+    Example:
+        genconfig blame parameters.num_nodes config.json
+    """
+    parser = argparse.ArgumentParser(prog="genconfig blame")
+    parser.add_argument(
+        "key", help="dotted key path", type=str)
+    parser.add_argument(
+        "output", help=f"config written with --provenance, or its {suffix} index", type=str)
+    args = parser.parse_args(args)
+
+    filename = index_path(args.output)
+    if not os.path.exists(filename):
+        sys.exit(f"{filename} not found, write the config with --provenance")
+    blamed = Provenance.read(filename).blame(args.key)
+    if not blamed:
+        sys.exit(f"{args.key} not found in {filename}")
+    for order, key, change, source in blamed:
+        print(f"#{order:<4} {change:<9} {key or '<root>'}  {source}")
@@ -0,0 +1,261 @@
+"""Validates config values against a JSON schema as they are merged.
+
+The schema is compiled once into a tree of nodes by key path, each holding
+the checks of its value. `genconfig.utils.merge` walks the node tree along
+with the dictionaries it merges and checks every value it inserts, only
+descending into inserted values where the schema has constraints. Required
+keys can be supplied by any file, they are checked once everything is merged.
+
+With `references` set, strings with `${...}` references are only checked
+once resolved by `genconfig.interpolate.Resolver`.
+
+Supported keywords: type, enum, const, minimum, maximum, exclusiveMinimum,
+exclusiveMaximum, minLength, maxLength, pattern, minItems, maxItems, items,
+properties, additionalProperties and required.
+"""
+from __future__ import annotations
+
+import numbers
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from genconfig.utils import is_list
+
+_types: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": is_list,
+    "string": lambda value: isinstance(value, str),
+    # also the NumPy scalars of compacted lists
+    "integer": lambda value: isinstance(value, numbers.Integral) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, numbers.Real) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+
+class Violation(NamedTuple):
+    """A config value not matching the schema."""
+
+    path: str
+    """The dotted key path of the value."""
+    message: str
+    """What is wrong with the value."""
+    source: Optional[str]
+    """The config file the value was read from, if known."""
+
+    def __str__(self):
+        """Returns the print value."""
+        return f"{self.source or '<unknown>'}: {self.path}: {self.message}"
+
+
+class SchemaError(ValueError):
+    """Raised when the config does not match the schema."""
+
+    def __init__(self, violations: List[Violation]):
+        """Lists every violation in the message."""
+        self.violations = violations
+        """The violations found."""
+        super().__init__(
+            f"{len(violations)} schema violation(s)\n" + "\n".join(map(str, violations)))
+
+
+def _compile_checks(schema: Dict[str, Any]) -> List[Callable[[Any], Optional[str]]]:
+    """Returns the value checks of a schema, each returns an error message or None.
+
+    Raises:
+        ValueError: if the schema has an unknown type
+    """
+    checks: List[Callable[[Any], Optional[str]]] = []
+    if "type" in schema:
+        expected = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        for name in expected:
+            if name not in _types:
+                raise ValueError(
+                    f"Unknown schema type {name!r}, expected one of {', '.join(_types)}")
+        type_checks = [_types[name] for name in expected]
+        checks.append(lambda value: None if any(check(value) for check in type_checks)
+                      else f"expected {' or '.join(expected)} got {type(value).__name__}")
+    if "enum" in schema:
+        options = schema["enum"]
+        checks.append(lambda value: None if value in options else f"expected one of {options}")
+    if "const" in schema:
+        const = schema["const"]
+        checks.append(lambda value: None if value == const else f"expected {const!r}")
+
+    def number(check: Callable[[float], bool], message: str) -> Callable[[Any], Optional[str]]:
+        return lambda value: None if not _types["number"](value) or check(value) else message
+
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+        checks.append(number(lambda value: value >= minimum, f"expected at least {minimum}"))
+    if "maximum" in schema:
+        maximum = schema["maximum"]
+        checks.append(number(lambda value: value <= maximum, f"expected at most {maximum}"))
+    if "exclusiveMinimum" in schema:
+        bound = schema["exclusiveMinimum"]
+        checks.append(number(lambda value: value > bound, f"expected more than {bound}"))
+    if "exclusiveMaximum" in schema:
+        bound = schema["exclusiveMaximum"]
+        checks.append(number(lambda value: value < bound, f"expected less than {bound}"))
+
+    def sized(types: Callable[[Any], bool], name: str) -> None:
+        minimum, maximum = schema.get(f"min{name}"), schema.get(f"max{name}")
+        if minimum is not None:
+            checks.append(lambda value: None if not types(value) or len(value) >= minimum
+                          else f"expected at least {minimum} {name.lower()}")
+        if maximum is not None:
+            checks.append(lambda value: None if not types(value) or len(value) <= maximum
+                          else f"expected at most {maximum} {name.lower()}")
+
+    sized(_types["string"], "Length")
+    sized(is_list, "Items")
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+        checks.append(lambda value: None if not isinstance(value, str) or pattern.search(value)
+                      else f"expected to match {pattern.pattern!r}")
+    return checks
+
+
+class SchemaNode:
+    """The compiled checks of the values at a key path."""
+
+    def __init__(self, schema: Dict[str, Any], root: Schema):
+        """Compiles the schema of the key path and its sub-keys.
+
+        Params:
+            schema: the JSON schema of the values at the key path
+            root: the compiled schema, collecting the violations
+        """
+        assert isinstance(schema, dict), f"expected dict got {type(schema)}"
+        self.root = root
+        self.checks = _compile_checks(schema)
+        self.required = tuple(schema.get("required", ()))
+        self.properties = {
+            str(key): SchemaNode(value, root)
+            for key, value in schema.get("properties", {}).items()
+        }
+        additional = schema.get("additionalProperties", True)
+        self.closed = additional is False
+        self.additional = SchemaNode(additional, root) if isinstance(additional, dict) else None
+        self.items = SchemaNode(schema["items"], root) if isinstance(
+            schema.get("items"), dict) else None
+
+    def child(self, key: Any) -> Optional[SchemaNode]:
+        """Returns the node of a sub-key, None if the sub-key is unconstrained."""
+        return self.properties.get(str(key), self.additional)
+
+    def check(
+            self,
+            key: Any,
+            value: Any,
+            path: Sequence[str],
+            new_items: Optional[Any] = None):
+        """Checks the value of a sub-key and everything under it.
+
+        Params:
+            key: the sub-key
+            value: the value inserted at the sub-key
+            path: the key path of this node
+            new_items: only these items of a list value are checked, the
+                others were checked when inserted
+        """
+        if self.closed and str(key) not in self.properties:
+            self.root.report(list(path) + [str(key)], "unexpected key")
+            return
+        node = self.child(key)
+        if node is not None:
+            node.validate(value, list(path) + [str(key)], new_items)
+
+    def validate(self, value: Any, path: List[str], new_items: Optional[Any] = None):
+        """Checks the value at this node and everything under it."""
+        if self.root.references and isinstance(value, str) and "${" in value:
+            # checked once resolved
+            return
+        for check in self.checks:
+            message = check(value)
+            if message is not None:
+                self.root.report(path, message)
+        if isinstance(value, dict):
+            if self.closed or self.properties or self.additional is not None:
+                for key, sub_value in value.items():
+                    self.check(key, sub_value, path, None)
+        elif self.items is not None and is_list(value):
+            items = value if new_items is None else new_items
+            offset = len(value) - len(items)
+            for index, item in enumerate(items):
+                self.items.validate(item, path + [str(offset + index)])
+
+
+class Schema:
+    """A JSON schema compiled into per key path checks.
+
+    Example:
+        `JsonParser().load("config_folder", schema=Schema({"type": "object"}, fail_fast=True))`
+    """
+
+    def __init__(self, schema: Dict[str, Any], fail_fast: bool = False, references: bool = False):
+        """Compiles the schema.
+
+        Params:
+            schema: the JSON schema of the whole config
+            fail_fast: if to raise on the first violation instead of
+                collecting all of them
+            references: if the `${...}` references are resolved once merged,
+                then they are checked when resolved
+
+        Raises:
+            ValueError: if the schema has an unknown type
+        """
+        self.fail_fast = fail_fast
+        """If to raise on the first violation."""
+        self.references = references
+        """If strings with references are checked when resolved instead of when merged."""
+        self.violations: List[Violation] = []
+        """The violations found so far."""
+        self.source: Optional[str] = None
+        """The config file being merged, set by `Parser.join`."""
+        self.root = SchemaNode(schema, self)
+        """The node of the whole config."""
+
+    def reset(self) -> Schema:
+        """Forgets the violations and source of a previous run, the schema can be reused."""
+        self.violations = []
+        self.source = None
+        return self
+
+    def at(self, path: Sequence[Any]) -> Optional[SchemaNode]:
+        """Returns the node of a key path, None if the key path is unconstrained."""
+        node: Optional[SchemaNode] = self.root
+        for key in path:
+            if node is None:
+                return None
+            node = node.child(key)
+        return node
+
+    def report(self, path: Sequence[str], message: str):
+        """Records a violation, raises SchemaError at once if fail_fast."""
+        violation = Violation(".".join(path), message, self.source)
+        self.violations.append(violation)
+        if self.fail_fast:
+            raise SchemaError([violation])
+
+    def check(self, config: Dict[Any, Any]):
+        """Checks the required keys of the merged config, only the schema properties are walked.
+
+        Raises:
+            SchemaError: with every violation found while merging and checking
+        """
+        self.source = None
+        stack = [(self.root, config, [])]
+        while stack:
+            node, value, path = stack.pop()
+            if not isinstance(value, dict):
+                continue
+            for key in node.required:
+                if key not in value:
+                    self.report(path + [key], "missing required key")
+            for key, child in node.properties.items():
+                if key in value:
+                    stack.append((child, value[key], path + [key]))
+        if self.violations:
+            raise SchemaError(self.violations)
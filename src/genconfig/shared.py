@@ -0,0 +1,295 @@
+"""Publishes the merged config into a memory-mapped file shared by processes.
+
+The config is flattened into leaf key paths, sorted, and written once into a
+compact binary layout:
+
+    header: magic, layout version, generation, number of entries
+    index:  (key offset, key length, value offset, value length) per entry
+    data:   the key paths and the json encoded leaf values
+
+Readers map the file and binary search the index, only the requested values
+are decoded so every process shares the same pages instead of holding its own
+copy. A new config is written to a temporary file and swapped in with
+`os.replace`, readers pick it up on `SharedConfig.refresh`. Publishers of the
+same file take turns on a lock file next to it, so every generation is
+published once. Place the file under `/dev/shm` to keep it in shared memory.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import secrets
+import struct
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+from genconfig.utils import to_builtin
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_magic = b"GCFG"
+_layout_version = 1
+_header_struct = struct.Struct("<4sHHQQ")
+_entry_struct = struct.Struct("<QIQI")
+_separator = b"\x00"
+
+Key = Union[str, Sequence[Any]]
+
+
+def _encode_key(key: Key) -> bytes:
+    """Encodes a dotted key or a sequence of keys into the stored key path."""
+    if isinstance(key, str):
+        key = key.split(".") if key else []
+    return _separator.join(str(part).encode("utf-8") for part in key)
+
+
+def _flatten(config: Any, path: Tuple[str, ...] = ()) -> Iterator[Tuple[bytes, Any]]:
+    """Yields (key path, leaf value), dictionaries are expanded into their keys."""
+    if isinstance(config, dict) and config:
+        for key, value in config.items():
+            yield from _flatten(value, path + (str(key), ))
+    else:
+        yield _encode_key(path), config
+
+
+def _read_generation(path: str) -> int:
+    """Returns the generation of an existing published file, 0 if none."""
+    try:
+        with open(path, "rb") as file:
+            header = file.read(_header_struct.size)
+        magic, version, _, generation, _ = _header_struct.unpack(header)
+    except (OSError, struct.error):
+        return 0
+    if magic != _magic or version != _layout_version:
+        return 0
+    return generation
+
+
+def _write(path: str, header: bytes, index: List[bytes], data: List[bytes]):
+    """Writes to a temporary file then swaps it in atomically."""
+    dirname = os.path.dirname(os.path.abspath(path))
+    while True:
+        temp_path = os.path.join(dirname, f".genconfig-{secrets.token_hex(8)}")
+        try:
+            # created with the mode of new files, readers can be other users
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            break
+        except FileExistsError:  # pragma: no cover
+            continue
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(header)
+            file.writelines(index)
+            file.writelines(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def publish(config: Dict[str, Any], path: str) -> int:
+    """Serializes the config once into the shared file.
+
+    Params:
+        config: the merged config
+        path: the file to publish to, replaced atomically if it exists, the
+            publishers take turns on the `path + ".lock"` file
+
+    Returns:
+        the generation of the published config
+
+    Example:
+        `publish(JsonParser().load("config_folder").config, "/dev/shm/config.gcfg")`
+    """
+    assert isinstance(config, dict), f"expected dict got {type(config)}"
+    assert isinstance(path, str), f"expected str got {type(path)}"
+
+    entries = sorted(
+        (key, json.dumps(value, separators=(",", ":"), default=to_builtin).encode("utf-8"))
+        for key, value in _flatten(config)
+        if key or value != {}
+    )
+
+    # lay out the index followed by the data region
+    index: List[bytes] = []
+    data: List[bytes] = []
+    offset = _header_struct.size + _entry_struct.size * len(entries)
+    for key, value in entries:
+        index.append(_entry_struct.pack(offset, len(key), offset + len(key), len(value)))
+        data.append(key)
+        data.append(value)
+        offset += len(key) + len(value)
+
+    # the published file is replaced, lock a file next to it
+    lock_fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        generation = _read_generation(path) + 1
+        _write(path, _header_struct.pack(
+            _magic, _layout_version, 0, generation, len(entries)), index, data)
+    finally:
+        os.close(lock_fd)
+
+    logger.info(f"Published {len(entries)} keys to {path} as generation {generation}")
+    return generation
+
+
+class SharedConfig:
+    """Read only view of a config published with `publish`.
+
+    Example:
+        `SharedConfig("/dev/shm/config.gcfg")["function.function1.name"]`
+    """
+
+    def __init__(self, path: str):
+        """Maps the published file.
+
+        Params:
+            path: the published config file
+        """
+        assert isinstance(path, str), f"expected str got {type(path)}"
+        self.path = path
+        """The published config file."""
+        self._file = None
+        self._map = None
+        self._open()
+
+    def _open(self):
+        """Maps the file currently at self.path."""
+        file = open(self.path, "rb")
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            file.close()
+            raise
+        magic, version, _, generation, count = _header_struct.unpack_from(buffer, 0)
+        if magic != _magic or version != _layout_version:
+            buffer.close()
+            file.close()
+            raise ValueError(f"{self.path} is not a published config")
+        self.close()
+        self._file, self._map = file, buffer
+        self._count = count
+        self._stat = os.fstat(file.fileno())
+        self.generation: int = generation
+        """The generation of the mapped config."""
+
+    def refresh(self) -> bool:
+        """Maps the latest published config if it has been replaced.
+
+        Returns:
+            bool representing if a new generation is mapped
+        """
+        stat = os.stat(self.path)
+        if (stat.st_ino, stat.st_mtime_ns) == (self._stat.st_ino, self._stat.st_mtime_ns):
+            return False
+        self._open()
+        return True
+
+    def close(self):
+        """Unmaps the file."""
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+    def __enter__(self) -> SharedConfig:
+        """Enters context."""
+        return self
+
+    def __exit__(self, *args):
+        """Exits context, unmaps the file."""
+        self.close()
+
+    def __len__(self) -> int:
+        """Returns the number of leaf keys."""
+        return self._count
+
+    def _entry(self, index: int) -> Tuple[int, int, int, int]:
+        """Returns the (key offset, key length, value offset, value length)."""
+        offset = _header_struct.size + _entry_struct.size * index
+        return _entry_struct.unpack_from(self._map, offset)
+
+    def _key(self, index: int) -> bytes:
+        """Returns the key path of the entry."""
+        key_offset, key_length, _, _ = self._entry(index)
+        return self._map[key_offset:key_offset + key_length]
+
+    def _value(self, index: int) -> Any:
+        """Decodes the value of the entry."""
+        _, _, value_offset, value_length = self._entry(index)
+        return json.loads(self._map[value_offset:value_offset + value_length])
+
+    def _lower_bound(self, key: bytes) -> int:
+        """Returns the first entry index with key path not less than key."""
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _prefix_range(self, key: bytes) -> Iterator[int]:
+        """Yields the entry indexes under the key path."""
+        prefix = key + _separator if key else b""
+        index = self._lower_bound(prefix)
+        while index < self._count and self._key(index).startswith(prefix):
+            yield index
+            index += 1
+
+    def keys(self, prefix: Key = "") -> Iterator[str]:
+        """Yields the dotted leaf keys, optionally under a prefix key."""
+        for index in self._prefix_range(_encode_key(prefix)):
+            yield self._key(index).decode("utf-8").replace("\0", ".")
+
+    def get(self, key: Key, default: Any = None) -> Any:
+        """Looks up a key, a sub-dictionary is rebuilt from its leaves.
+
+        Params:
+            key: dotted key path, or sequence of keys
+            default: returned if the key is not present
+
+        Returns:
+            the config value
+        """
+        encoded = _encode_key(key)
+        index = self._lower_bound(encoded)
+        if index < self._count and self._key(index) == encoded:
+            return self._value(index)
+
+        config: Dict[str, Any] = {}
+        depth = len(encoded.split(_separator)) if encoded else 0
+        for index in self._prefix_range(encoded):
+            parts = self._key(index).decode("utf-8").split("\0")[depth:]
+            current = config
+            for part in parts[:-1]:
+                current = current.setdefault(part, {})
+            current[parts[-1]] = self._value(index)
+        if not config and encoded:
+            return default
+        return config
+
+    def __getitem__(self, key: Key) -> Any:
+        """Looks up a key, raises KeyError if not present."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Key) -> bool:
+        """Checks if the key is present."""
+        encoded = _encode_key(key)
+        index = self._lower_bound(encoded)
+        if index < self._count and self._key(index) == encoded:
+            return True
+        return next(self._prefix_range(encoded), None) is not None
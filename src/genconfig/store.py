@@ -0,0 +1,394 @@
+"""SQLite backed config store for configs larger than memory.
+
+Every leaf value is a row keyed by its key path, sub-dictionaries only exist as
+the common prefix of their leaves. Lists and empty dictionaries are leaves,
+values are stored json encoded. The key path is the primary key, so lookups
+and prefix scans are index range scans.
+
+Keys are exported in the order they were first merged, as a merged
+dictionary. Every key path has a position, the position of its parent
+followed by the number of the key in merge order, kept while its value is
+replaced. Leaves are exported by position, the rows of a sub-dictionary are
+contiguous. Only string keys are stored.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+from typing import (
+    TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union)
+
+from genconfig.utils import (
+    concat, is_list, merge, open_compressed, same_value, select_match, to_builtin)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from genconfig.provenance import Provenance
+    from genconfig.schema import SchemaNode
+
+logger = logging.getLogger(__name__)
+
+_separator = "\x1f"
+_missing = object()
+
+Key = Union[str, Sequence[Any]]
+
+
+def _encode(parts: Sequence[Any]) -> str:
+    """Encodes the key path parts into the stored key path."""
+    return _separator.join(str(part) for part in parts)
+
+
+def _decode(path: str) -> List[str]:
+    """Decodes the stored key path into its parts."""
+    return path.split(_separator) if path else []
+
+
+def _key_parts(key: Key) -> Tuple[str, ...]:
+    """Returns the parts of a dotted key or a sequence of keys."""
+    if isinstance(key, str):
+        return tuple(key.split(".")) if key else ()
+    return tuple(str(part) for part in key)
+
+
+def _part(key: Any, parts: Sequence[str]) -> str:
+    """Returns the key as a key path part, raises ValueError for non string keys."""
+    if not isinstance(key, str):
+        raise ValueError(
+            f"Cannot store the key {key!r} at {'.'.join(parts) or '<root>'}, "
+            f"only string keys are supported")
+    return key
+
+
+def _build(rows: Iterable[Tuple[List[str], Any]]) -> Dict[str, Any]:
+    """Builds a dictionary from the (key path parts, value) of its leaves."""
+    config: Dict[str, Any] = {}
+    for parts, value in rows:
+        current = config
+        for part in parts[:-1]:
+            current = current.setdefault(part, {})
+        current[parts[-1]] = value
+    return config
+
+
+class SqliteStore:
+    """Config store merging fragments into a SQLite file.
+
+    Example:
+        `SqliteStore("config.sqlite").merge({"name": "config-01"}).get("name")`
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        """Opens the store, creating it if it does not exist.
+
+        Params:
+            path: the SQLite file
+        """
+        assert isinstance(path, str), f"expected str got {type(path)}"
+        self.path = path
+        """The SQLite file."""
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS config (path TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "position BLOB NOT NULL DEFAULT x'') WITHOUT ROWID")
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(config)")]
+            if "position" not in columns:
+                # stores written before the positions are exported in key order
+                self._connection.execute(
+                    "ALTER TABLE config ADD COLUMN position BLOB NOT NULL DEFAULT x''")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS config_position ON config (position)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS nodes (path TEXT PRIMARY KEY, position BLOB NOT NULL) "
+                "WITHOUT ROWID")
+        # the last 8 bytes of a position are the number of the key
+        last = self._connection.execute("SELECT MAX(substr(position, -8)) FROM nodes").fetchone()
+        self._ordinal = int.from_bytes(last[0], "big") if last[0] is not None else 0
+
+    def close(self):
+        """Closes the store."""
+        self._connection.close()
+
+    def __enter__(self) -> SqliteStore:
+        """Enters context."""
+        return self
+
+    def __exit__(self, *args):
+        """Exits context, closes the store."""
+        self.close()
+
+    def __len__(self) -> int:
+        """Returns the number of leaf values."""
+        return self._connection.execute("SELECT COUNT(*) FROM config").fetchone()[0]
+
+    def clear(self) -> SqliteStore:
+        """Removes every value."""
+        with self._connection:
+            self._connection.execute("DELETE FROM config")
+            self._connection.execute("DELETE FROM nodes")
+        self._ordinal = 0
+        return self
+
+    def _leaf(self, path: str) -> Any:
+        """Returns the leaf value at the key path, _missing if it is not a leaf."""
+        row = self._connection.execute(
+            "SELECT value FROM config WHERE path = ?", (path, )).fetchone()
+        return json.loads(row[0]) if row is not None else _missing
+
+    def _rows(self, path: str) -> Iterator[Tuple[str, str]]:
+        """Yields the (key path, json value) rows under the key path in order."""
+        if path:
+            # every key path starting with path + separator
+            query = ("SELECT path, value FROM config WHERE path > ? AND path < ? "
+                     "ORDER BY position, path")
+            parameters: Tuple[str, ...] = (
+                path + _separator, path + chr(ord(_separator) + 1))
+        else:
+            query, parameters = "SELECT path, value FROM config ORDER BY position, path", ()
+        yield from self._connection.execute(query, parameters)
+
+    def _has_rows(self, path: str) -> bool:
+        """Checks if there are leaves under the key path."""
+        return self._connection.execute(
+            "SELECT 1 FROM config WHERE path > ? AND path < ? LIMIT 1",
+            (path + _separator, path + chr(ord(_separator) + 1))).fetchone() is not None
+
+    def _materialize(self, path: str) -> Any:
+        """Returns the value at the key path, _missing if not present."""
+        value = self._leaf(path)
+        if value is not _missing:
+            return value
+        depth = len(_decode(path))
+        config = _build(
+            (_decode(row_path)[depth:], json.loads(row_value))
+            for row_path, row_value in self._rows(path))
+        return config if config or not path else _missing
+
+    def _delete(self, path: str):
+        """Removes the value at the key path, the key path keeps its position."""
+        self._connection.execute("DELETE FROM config WHERE path = ?", (path, ))
+        for table in ("config", "nodes"):
+            self._connection.execute(
+                f"DELETE FROM {table} WHERE path > ? AND path < ?",
+                (path + _separator, path + chr(ord(_separator) + 1)))
+
+    def _new_position(self, parent: bytes) -> bytes:
+        """Returns the position of a new key under the parent position."""
+        self._ordinal += 1
+        return parent + self._ordinal.to_bytes(8, "big")
+
+    def _position(self, parts: Tuple[str, ...]) -> bytes:
+        """Returns the position of the key path, new key paths are positioned last."""
+        position = b""
+        for depth in range(1, len(parts) + 1):
+            path = _encode(parts[:depth])
+            row = self._connection.execute(
+                "SELECT position FROM nodes WHERE path = ?", (path, )).fetchone()
+            if row is not None:
+                position = row[0]
+                continue
+            position = self._new_position(position)
+            self._connection.execute("INSERT INTO nodes VALUES (?, ?)", (path, position))
+        return position
+
+    def _flatten(
+            self,
+            value: Any,
+            parts: Tuple[str, ...],
+            position: bytes) -> Iterator[Tuple[str, str, bytes]]:
+        """Yields the (key path, json value, position) rows of the value at parts.
+
+        The sub-keys are new key paths, positioned in the order of the dictionary.
+        """
+        if isinstance(value, dict) and value:
+            for key, sub_value in value.items():
+                key_parts = parts + (_part(key, parts), )
+                key_position = self._new_position(position)
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO nodes VALUES (?, ?)",
+                    (_encode(key_parts), key_position))
+                yield from self._flatten(sub_value, key_parts, key_position)
+        else:
+            yield _encode(parts), json.dumps(value, default=to_builtin), position
+
+    def _insert(self, parts: Tuple[str, ...], value: Any):
+        """Writes the value at the key path."""
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO config VALUES (?, ?, ?)",
+            list(self._flatten(value, parts, self._position(parts))))
+
+    def _merge(
+            self,
+            parts: Tuple[str, ...],
+            b: Dict[Any, Any],
+            merge_conflict: bool,
+            raise_conflict: bool,
+            schema: Optional["SchemaNode"],
+            provenance: Optional["Provenance"]):
+        """Merges dictionary b into the dictionary at parts, see `genconfig.utils.merge`."""
+        path = _encode(parts)
+        if parts and b and self._leaf(path) == {}:
+            # the empty dictionary leaf is replaced by the keys of b
+            self._delete(path)
+
+        items = list(b.items())
+        for index, (key, b_value) in enumerate(items):
+            key_parts = parts + (_part(key, parts), )
+            key_path = _encode(key_parts)
+            current_path = ".".join(key_parts)
+            a_value = self._leaf(key_path)
+            a_is_dict = isinstance(a_value, dict) or (
+                a_value is _missing and self._has_rows(key_path))
+
+            # copy value from b if key not present in a
+            if a_value is _missing and not a_is_dict:
+                self._insert(key_parts, b_value)
+                if schema is not None:
+                    schema.check(key, b_value, parts)
+                if provenance is not None:
+                    provenance.record(key_parts, "set")
+            # recursive merge the sub-dictionary
+            elif a_is_dict and isinstance(b_value, dict):
+                self._merge(
+                    key_parts, b_value, merge_conflict, raise_conflict,
+                    schema.child(key) if schema is not None else None, provenance)
+            # do nothing if the leaf value of a, b are the same
+            elif not a_is_dict and same_value(a_value, b_value):
+                logger.debug(f"Same value at {current_path}")
+            # if both children are list, append them
+            elif is_list(a_value) and is_list(b_value) and merge_conflict:
+                logger.warning(f"Merger at {current_path}")
+                a_value = concat(a_value, b_value)
+                self._insert(key_parts, a_value)
+                if schema is not None:
+                    schema.check(key, a_value, parts, new_items=b_value)
+                if provenance is not None:
+                    provenance.record(key_parts, "append")
+            elif merge_conflict:
+                logger.warning(f"Conflict at {current_path}")
+                if parts:
+                    # the dictionary becomes a list of conflicting dictionaries,
+                    # merge the rest of b in memory to keep the exact semantics
+                    a = self._materialize(path)
+                    a_parent = {parts[-1]: a}
+                    rest = dict(items[index:])
+                    merge(a, rest, list(parts), a_parent, rest,
+                          merge_conflict=merge_conflict, raise_conflict=raise_conflict,
+                          schema=schema, provenance=provenance)
+                    # the keys of b before the conflict are in the store, b is appended whole
+                    conflicts = [b if value is rest else value for value in a_parent[parts[-1]]]
+                    self._delete(path)
+                    self._insert(parts, conflicts)
+                    return
+            elif not raise_conflict:
+                # if don't merge and dont raise error, then override
+                logger.warning(f"Conflict at {current_path}, override the values")
+                self._delete(key_path)
+                self._insert(key_parts, b_value)
+                if schema is not None:
+                    schema.check(key, b_value, parts)
+                if provenance is not None:
+                    provenance.record(key_parts, "override")
+            else:
+                # raise ValueError if do not want to merge
+                raise ValueError(f"Conflict at {current_path}")
+
+    def merge(
+            self,
+            config: Dict[Any, Any],
+            path: Key = (),
+            merge_conflict: bool = True,
+            raise_conflict: bool = True,
+            schema: Optional["SchemaNode"] = None,
+            provenance: Optional["Provenance"] = None) -> SqliteStore:
+        """Merges the config into the store, with the conflict handling of `genconfig.utils.merge`.
+
+        Params:
+            config: the config to be merged
+            path: the key path to merge the config at, dotted or a sequence of keys
+            merge_conflict: when facing conflict, do we merge them using list
+                structure, if set as False then we will override
+            raise_conflict: if to raise issue when facing with conflict
+            schema: the compiled schema at the key path, the values merged are
+                checked as they are inserted, see `genconfig.schema`
+            provenance: records the key paths changed by the config, see `genconfig.provenance`
+
+        Returns:
+            self
+        """
+        assert isinstance(config, dict), f"expected dict got {type(config)}"
+        with self._connection:
+            self._merge(
+                _key_parts(path), config, merge_conflict, raise_conflict, schema, provenance)
+        return self
+
+    def select(self, select: Tuple[str] = ("", )) -> SqliteStore:
+        """Keeps only the selected dotted key paths, see `genconfig.utils.select_config`."""
+        if select == ("", ):
+            return self
+        removed = [
+            (path, ) for path, _ in self._rows("")
+            if not select_match(tuple(_decode(path)), select)
+        ]
+        with self._connection:
+            for table in ("config", "nodes"):
+                self._connection.executemany(f"DELETE FROM {table} WHERE path = ?", removed)
+        return self
+
+    def get(self, key: Key, default: Any = None) -> Any:
+        """Looks up a key, a sub-dictionary is built from its leaves.
+
+        Params:
+            key: dotted key path, or sequence of keys, empty for the whole config
+            default: returned if the key is not present
+
+        Returns:
+            the config value
+        """
+        value = self._materialize(_encode(_key_parts(key)))
+        return default if value is _missing else value
+
+    def __getitem__(self, key: Key) -> Any:
+        """Looks up a key, raises KeyError if not present."""
+        value = self._materialize(_encode(_key_parts(key)))
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Key) -> bool:
+        """Checks if the key is present."""
+        path = _encode(_key_parts(key))
+        return self._leaf(path) is not _missing or self._has_rows(path)
+
+    def items(self, prefix: Key = "") -> Iterator[Tuple[str, Any]]:
+        """Yields the (dotted key, leaf value) under the prefix key, in merge order."""
+        for path, value in self._rows(_encode(_key_parts(prefix))):
+            yield ".".join(_decode(path)), json.loads(value)
+
+    def top_items(self) -> Iterator[Tuple[str, Any]]:
+        """Yields the top level (key, value), only one top level value is built at a time."""
+        current_key, rows = None, []
+        for path, value in self._rows(""):
+            parts = _decode(path)
+            if parts[0] != current_key:
+                if rows:
+                    yield current_key, _build(rows)[current_key]
+                current_key, rows = parts[0], []
+            rows.append((parts, json.loads(value)))
+        if rows:
+            yield current_key, _build(rows)[current_key]
+
+    def write(self, filename: str, parser: Any):
+        """Writes the stored config with the parser, one top level key at a time.
+
+        Params:
+            filename: the file to be written
+            parser: the parser to write with
+
+        Example:
+            `write("config.json", JsonParser())`
+        """
+        filename = parser._append_extension(filename)
+        with open_compressed(filename, "w", parser.compression_level) as file:
+            parser._write_items(file, self.top_items())
@@ -1,8 +1,121 @@
+import array
+import bz2
+import gzip
 import logging
-from typing import Any, Dict, Optional, List
+import lzma
+import os
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterator, Optional, List, Tuple
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+if TYPE_CHECKING:  # pragma: no cover
+    from genconfig.provenance import Provenance
+    from genconfig.schema import SchemaNode
 
 logger = logging.getLogger(__name__)
 
+compact_kinds = ("array", "numpy")
+"""The array types homogeneous numeric lists can be stored as."""
+
+
+def is_list(value: Any) -> bool:
+    """Checks if the value is a list, or a list stored as an array by `compact`."""
+    return isinstance(value, (list, array.array)) or (
+        numpy is not None and isinstance(value, numpy.ndarray))
+
+
+def same_value(a: Any, b: Any) -> bool:
+    """Checks if two values are the same, arrays are compared by their items."""
+    if numpy is not None and (isinstance(a, numpy.ndarray) or isinstance(b, numpy.ndarray)):
+        return bool(numpy.array_equal(a, b))
+    if isinstance(a, array.array) != isinstance(b, array.array):
+        return is_list(a) and is_list(b) and list(a) == list(b)
+    return a == b
+
+
+def concat(a: Any, b: Any) -> Any:
+    """Concatenates two lists or arrays, a is extended in place when possible.
+
+    Arrays of the same type are concatenated without boxing their items, a list
+    and an array, or arrays of different types, give a list so integers are
+    not converted to floats.
+    """
+    if isinstance(a, list) and isinstance(b, list):
+        a += b
+        return a
+    if numpy is not None and (isinstance(a, numpy.ndarray) or isinstance(b, numpy.ndarray)):
+        if (is_list(a) and is_list(b) and not isinstance(a, list) and not isinstance(b, list)
+                and numpy.asarray(a).dtype == numpy.asarray(b).dtype):
+            return numpy.concatenate((a, b))
+    elif isinstance(a, array.array) and isinstance(b, array.array):
+        if a.typecode == b.typecode:
+            a += b
+            return a
+    return list(a) + list(b)
+
+
+def _typecode(values: List[Any]) -> Optional[str]:
+    """Returns the array type code of a homogeneous numeric list, None if it is not one."""
+    if all(isinstance(value, float) for value in values):
+        return "d"
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        if -2 ** 63 <= min(values) and max(values) < 2 ** 63:
+            return "q"
+    return None
+
+
+def compact(config: Any, kind: Optional[str] = "array", min_length: int = 16) -> Any:
+    """Stores the homogeneous numeric lists of the config as arrays, in place.
+
+    Lists of only floats or only integers are stored as `array.array`, or as
+    NumPy arrays for kind "numpy", using 8 bytes per number instead of a boxed
+    object each. Other lists are walked for sub-dictionaries.
+
+    Params:
+        config: the config to be compacted
+        kind: "array", "numpy", or None to keep the lists
+        min_length: lists shorter than this are kept as lists
+
+    Returns:
+        the compacted config
+
+    Example:
+        `compact({"grid": [0.1] * 16})` -> {"grid": array("d", [0.1, ...])}
+    """
+    if kind is None:
+        return config
+    assert kind in compact_kinds, f"expected one of {compact_kinds} got {kind}"
+    if kind == "numpy" and numpy is None:
+        logger.warning("numpy is not installed, storing numeric lists as array.array")
+        kind = "array"
+    if isinstance(config, dict):
+        for key, value in config.items():
+            config[key] = compact(value, kind, min_length)
+    elif isinstance(config, list):
+        typecode = _typecode(config) if len(config) >= min_length else None
+        if typecode is None:
+            for index, value in enumerate(config):
+                config[index] = compact(value, kind, min_length)
+        elif kind == "numpy":
+            return numpy.array(config, dtype=numpy.float64 if typecode == "d" else numpy.int64)
+        else:
+            return array.array(typecode, config)
+    return config
+
+
+def to_builtin(value: Any) -> Any:
+    """Returns arrays as lists, used as `json.dump` default to write compacted configs.
+
+    Raises:
+        TypeError: if the value is not an array
+    """
+    if is_list(value) or (numpy is not None and isinstance(value, numpy.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
 
 def merge(
         a: Dict[Any, Any], b: Dict[Any, Any],
@@ -10,7 +123,9 @@ def merge(
         a_parent: Optional[Dict[str, str]] = None,
         b_parent: Optional[Dict[str, str]] = None,
         merge_conflict: bool = True,
-        raise_conflict: bool = True):
+        raise_conflict: bool = True,
+        schema: Optional["SchemaNode"] = None,
+        provenance: Optional["Provenance"] = None):
     """Merges dictionary b into dictionary a.
 
     Handles duplicate leaf vale
@@ -27,6 +142,9 @@ def merge(
         merge_conflict: when facing conflict, do we merge them using list
             structure, if set as False then we will override
         raise_conflict: if to raise issue when facing with conflict
+        schema: the compiled schema of a, the values taken from b are checked
+            as they are inserted, see `genconfig.schema`
+        provenance: records the key paths changed by b, see `genconfig.provenance`
     """
     # path tracks the current layer in dictionary
     if path is None:
@@ -38,15 +156,21 @@ def merge(
             # recursive merge the sub-dictionary
             if isinstance(a[key], dict) and isinstance(b[key], dict):
                 merge(a[key], b[key], path + [str(key)], a, b,
-                      merge_conflict=merge_conflict, raise_conflict=raise_conflict)
+                      merge_conflict=merge_conflict, raise_conflict=raise_conflict,
+                      schema=schema.child(key) if schema is not None else None,
+                      provenance=provenance)
             # do nothing if the leaf value of a, b are the same
-            elif a[key] == b[key]:
+            elif same_value(a[key], b[key]):
                 logger.debug(f"Same value at {current_path}")
                 pass  # same leaf value
             # if both children are list, append them
-            elif isinstance(a[key], list) and isinstance(b[key], list) and merge_conflict:
+            elif is_list(a[key]) and is_list(b[key]) and merge_conflict:
                 logger.warning(f"Merger at {current_path}")
-                a[key] += b[key]
+                a[key] = concat(a[key], b[key])
+                if schema is not None:
+                    schema.check(key, a[key], path, new_items=b[key])
+                if provenance is not None:
+                    provenance.record(path + [str(key)], "append")
             # conflict arise when the value of a and b are different
             # and they are not both sub-dictionary wich we can combine again
             # resolve by appending them to a list
@@ -58,14 +182,172 @@ def merge(
                         a_parent[parent_key] = [a, ]
                     a_parent[parent_key].append(b)
                     logger.warning(f"Added child to parent at {current_path}")
+                    if schema is not None:
+                        # the parent value is now the list of the conflicting dictionaries
+                        schema.validate(a_parent[parent_key], path, new_items=[b])
+                    if provenance is not None:
+                        provenance.record(path, "conflict")
             elif not raise_conflict:
                 # if don't merge and dont raise error, then override
                 logger.warning(f"Conflict at {current_path}, override the values")
                 a[key] = b[key]
+                if schema is not None:
+                    schema.check(key, b[key], path)
+                if provenance is not None:
+                    provenance.record(path + [str(key)], "override")
             else:
                 # raise ValueError if do not want to merge
                 raise ValueError(f"Conflict at {current_path}")
         # copy value from b if key not present in a
         else:
             a[key] = b[key]
+            if schema is not None:
+                schema.check(key, b[key], path)
+            if provenance is not None:
+                provenance.record(path + [str(key)], "set")
     return a
+
+
+def select_match(path: Tuple[Any, ...], select: Tuple[str] = ("", )) -> Optional[bool]:
+    """Checks if the key path can contribute to the selected key paths.
+
+    Params:
+        path: the key path, e.g. ("function", "function1")
+        select: the selected dotted key paths, e.g. ("function", "parameters.num_nodes")
+
+    Returns:
+        True if everything under the path is selected, False if only some of
+        its sub-keys can be selected, None if nothing under the path is selected
+
+    Example:
+        `select_match(("function", ), ("function.function1", ))` -> False
+    """
+    if select == ("", ):
+        return True
+    path = tuple(str(key) for key in path)
+    match = None
+    for selected in select:
+        selected = tuple(selected.split("."))
+        if path[:len(selected)] == selected:
+            return True
+        elif selected[:len(path)] == path:
+            match = False
+    return match
+
+
+def select_config(
+        config: Dict[Any, Any],
+        select: Tuple[str] = ("", ),
+        path: Tuple[Any, ...] = ()) -> Dict[Any, Any]:
+    """Keeps only the selected key paths of the config.
+
+    Params:
+        config: the config located at path
+        select: the selected dotted key paths
+        path: the key path of the config
+
+    Returns:
+        the config with only the selected keys, sub-dictionaries without any
+        selected keys are removed
+    """
+    if select_match(path, select):
+        return config
+    selected_config = {}
+    for key, value in config.items():
+        match = select_match(path + (key, ), select)
+        if match:
+            selected_config[key] = value
+        elif match is False and isinstance(value, dict):
+            value = select_config(value, select, path + (key, ))
+            if value:
+                selected_config[key] = value
+    return selected_config
+
+
+def _escape_key(key: Any) -> str:
+    """Escapes the dots in a key so flattened keys can be split unambiguously."""
+    return str(key).replace("\\", "\\\\").replace(".", "\\.")
+
+
+def flatten(config: Any) -> Iterator[Tuple[str, Any]]:
+    """Yields the (dotted key path, leaf value) of the config.
+
+    The config is walked depth first in insertion order with a stack, so only
+    the current path is held in memory. List items, including the lists made by
+    `merge` for conflicts, are keyed by their index. Dots and backslashes in
+    keys are escaped with a backslash. Empty dictionaries and lists are leaves.
+
+    Params:
+        config: the config to be flattened
+
+    Returns:
+        generator of (dotted key path, leaf value)
+
+    Example:
+        `list(flatten({"a": {"b": [1, 2]}}))` -> [("a.b.0", 1), ("a.b.1", 2)]
+    """
+    def items(value: Any) -> Iterator[Tuple[Any, Any]]:
+        return iter(value.items()) if isinstance(value, dict) else enumerate(value)
+
+    if not isinstance(config, dict) and not is_list(config):
+        yield "", config
+        return
+    path: List[str] = []
+    stack = [items(config)]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            if path:
+                path.pop()
+            continue
+        key, value = item
+        if (isinstance(value, dict) or is_list(value)) and len(value):
+            path.append(_escape_key(key))
+            stack.append(items(value))
+        else:
+            yield ".".join(path + [_escape_key(key)]), value
+
+
+compressions = {".gz": gzip, ".xz": lzma, ".bz2": bz2}
+"""The compression file extensions and their standard library codecs."""
+
+
+def split_compression(path: str) -> Tuple[str, str]:
+    """Splits the compression file extension from the path.
+
+    Example:
+        `split_compression("config.json.gz")` -> ("config.json", ".gz")
+
+        `split_compression("config.json")` -> ("config.json", "")
+    """
+    root, extension = os.path.splitext(path)
+    if extension in compressions:
+        return root, extension
+    return path, ""
+
+
+def open_compressed(filename: str, mode: str = "r", level: Optional[int] = None) -> IO[Any]:
+    """Opens the file, compressed files are streamed through their codec by file extension.
+
+    Params:
+        filename: the file to be opened
+        mode: the open mode, text mode unless "b" is given
+        level: the compression level when writing, gzip and bz2 take 1 to 9,
+            xz takes 0 to 9, defaults to the codec default
+
+    Returns:
+        the opened file
+
+    Example:
+        `open_compressed("config.json.gz", "w", level=6)`
+    """
+    codec = compressions.get(split_compression(filename)[1])
+    if codec is None:
+        return open(filename, mode)
+    if "b" not in mode:
+        mode += "t"
+    kwargs = {}
+    if level is not None and "r" not in mode:
+        kwargs = {"preset": level} if codec is lzma else {"compresslevel": level}
+    return codec.open(filename, mode, **kwargs)
@@ -0,0 +1,91 @@
+"""Test the genconfig daemon and client."""
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from genconfig.client import request
+from genconfig.daemon import BuildServer
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires Unix domain sockets")
+class TestDaemon(unittest.TestCase):
+    """Perform unit test for builds served by the daemon."""
+
+    base_path = os.path.dirname(os.path.realpath(__file__))
+    config_folder = os.path.abspath(
+        os.path.join(base_path, os.pardir, os.pardir, "sample-config", "config-json"))
+
+    def setUp(self):
+        """Starts the daemon on a temporary socket."""
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tempdir.name, "genconfig.sock")
+        self.server = BuildServer(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        """Stops the daemon."""
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.tempdir.cleanup()
+
+    def test_build(self):
+        """Daemon should build the config and rebuild once a file changes."""
+        config_folder = os.path.join(self.tempdir.name, "config")
+        shutil.copytree(self.config_folder, config_folder)
+        output_path = os.path.join(self.tempdir.name, "config.json")
+
+        response = request([config_folder, "-o", output_path], path=self.socket_path)
+        self.assertEqual(response, {"status": "ok"})
+        with open(output_path) as file:
+            self.assertEqual(json.load(file)["name"], "config-01")
+
+        # unchanged files reuse the merged config
+        merged_config = list(self.server.builds.values())[0][1]
+        request([config_folder, "-o", output_path], path=self.socket_path)
+        self.assertIs(list(self.server.builds.values())[0][1], merged_config)
+
+        # changed files are parsed again
+        main_path = os.path.join(config_folder, "main.json")
+        with open(main_path, "w") as file:
+            json.dump({"name": "config-02", "training": True}, file)
+        os.utime(main_path, ns=(0, 0))
+        request([config_folder, "-o", output_path], path=self.socket_path)
+        with open(output_path) as file:
+            self.assertEqual(json.load(file)["name"], "config-02")
+
+    def test_evict(self):
+        """Daemon should keep only the most recently used merged configs."""
+        self.server.max_builds = 1
+        output_path = os.path.join(self.tempdir.name, "config.json")
+        request([self.config_folder, "-o", output_path], path=self.socket_path)
+        request([self.config_folder, "-o", output_path, "-s", "name"], path=self.socket_path)
+        self.assertEqual(len(self.server.builds), 1)
+        self.assertIn(("select", repr(["name"])), list(self.server.builds)[0])
+
+    def test_error(self):
+        """Daemon should report failed builds."""
+        missing_path = os.path.join(self.tempdir.name, "missing")
+        response = request([missing_path], path=self.socket_path)
+        self.assertEqual(response["status"], "error")
+
+    def test_unavailable(self):
+        """Client should return None when no daemon is running."""
+        missing_socket = os.path.join(self.tempdir.name, "missing.sock")
+        self.assertIsNone(request([self.config_folder], path=missing_socket))
+
+    @unittest.skipUnless(hasattr(os, "getuid"), "requires Unix user ids")
+    def test_other_user(self):
+        """Client should not send builds to a socket of another user."""
+        with mock.patch("os.getuid", return_value=os.getuid() + 1):
+            self.assertIsNone(request([self.config_folder], path=self.socket_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Test the reference interpolation."""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from genconfig.cli import build, parse_args
+from genconfig.interpolate import Resolver, resolve
+from genconfig.parsers import JsonParser
+
+
+class TestInterpolate(unittest.TestCase):
+    """Perform unit test for resolving references."""
+
+    def config(self):
+        """Returns a config with chained references."""
+        return {
+            "name": "config-01",
+            "parameters": {"num_nodes": 200, "label": "nodes-${parameters.num_nodes}"},
+            "defaults": {"function": "${function.function1}", "first": "${pipeline.0.name}"},
+            "function": {"function1": {"name": "transform", "owner": "${name}"}},
+            "pipeline": [{"name": "extraction"}],
+            "literal": "$${name}",
+        }
+
+    def test_resolve(self):
+        """References should be replaced by the resolved referenced values."""
+        config = resolve(self.config())
+        self.assertEqual(config["parameters"]["label"], "nodes-200")
+        self.assertEqual(
+            config["defaults"]["function"], {"name": "transform", "owner": "config-01"})
+        self.assertIsNot(config["defaults"]["function"], config["function"]["function1"])
+        self.assertEqual(config["defaults"]["first"], "extraction")
+        self.assertEqual(config["literal"], "${name}")
+
+    def test_lazy(self):
+        """Only the keys read and their references should be resolved, once."""
+        resolver = Resolver(self.config())
+        with mock.patch.object(
+                resolver, "_substitute", wraps=resolver._substitute) as substitute:
+            self.assertEqual(resolver.get("defaults.function.owner"), "config-01")
+            self.assertEqual(resolver["defaults.function"]["owner"], "config-01")
+            self.assertEqual(resolver.get("function.function1.owner"), "config-01")
+        # defaults.function and function.function1.owner
+        self.assertEqual(substitute.call_count, 2)
+        self.assertEqual(resolver.config["parameters"]["label"], "nodes-${parameters.num_nodes}")
+        self.assertIsNone(resolver.get("missing"))
+
+    def test_lazy_eager(self):
+        """Keys read one at a time should resolve to the same values as resolve."""
+        def config():
+            return {
+                "name": "x",
+                "a": {"lit": "$${name}", "n": "${name}", "items": ["$${name}", {"m": "${name}"}]},
+                "b": "${a}",
+                "c": {"d": "${b.items}", "e": "${b}"},
+            }
+
+        def paths(value, parts=()):
+            yield parts
+            children = value.items() if isinstance(value, dict) else (
+                enumerate(value) if isinstance(value, list) else ())
+            for key, child in children:
+                yield from paths(child, parts + (str(key), ))
+
+        expected = resolve(config())
+        shared = Resolver(config())
+        for parts in paths(expected):
+            value = expected
+            for part in parts:
+                value = value[int(part) if isinstance(value, list) else part]
+            self.assertEqual(Resolver(config())[parts], value, parts)
+            self.assertEqual(shared[parts], value, parts)
+        self.assertEqual(shared.config, expected)
+
+        # values returned are not substituted again
+        resolver = Resolver(config())
+        b = resolver.get("b")
+        self.assertEqual(resolver.get("b.lit"), "${name}")
+        self.assertEqual(b, {"lit": "${name}", "n": "x", "items": ["${name}", {"m": "x"}]})
+
+    def test_errors(self):
+        """Cycles and unknown references should be reported with their key paths."""
+        with self.assertRaisesRegex(ValueError, "a -> b -> a"):
+            resolve({"a": "${b}", "b": "${a}"})
+        with self.assertRaisesRegex(ValueError, "a -> a.b -> a"):
+            resolve({"a": {"b": "${a}"}})
+        with self.assertRaisesRegex(ValueError, "Unknown reference"):
+            resolve({"a": "${b.c}", "b": {}})
+        with self.assertRaisesRegex(ValueError, "not a single value"):
+            resolve({"a": "x-${b}", "b": {"c": 1}})
+
+    def test_select(self):
+        """Selected keys should resolve references to keys not selected."""
+        with tempfile.TemporaryDirectory() as tempdirname:
+            config_folder = os.path.join(tempdirname, "config")
+            os.makedirs(os.path.join(config_folder, "defaults"))
+            with open(os.path.join(config_folder, "main.json"), "w") as file:
+                json.dump({"label": "nodes-${defaults.num_nodes}"}, file)
+            with open(os.path.join(config_folder, "defaults", "nodes.json"), "w") as file:
+                json.dump({"num_nodes": 200}, file)
+
+            config = JsonParser().load(
+                config_folder + os.sep, select=("label", ), interpolate=True).config
+            self.assertEqual(config, {"label": "nodes-200"})
+            args = parse_args([config_folder, "--select", "label", "--interpolate"])
+            self.assertEqual(build(args), {"label": "nodes-200"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,16 @@
 """Test the parser."""
+import io
 import os
+import shutil
 import tempfile  # create temp config files
 import unittest
 from contextlib import contextmanager
 from typing import Tuple
+from unittest import mock
 
 from genconfig.base_parser import Parser
-from genconfig.parsers import parser_list
+from genconfig.convert import convert_tree
+from genconfig.parsers import JsonParser, YamlParser, json_parser, parser_list
 
 
 class TestParser(unittest.TestCase):
@@ -250,6 +254,212 @@ class TestParser(unittest.TestCase):
             msg = f"loading {parser} with folder of config, without folder name as key"
             self.assertEqual(loaded_config, config_truth, msg)
 
+    def test_archive(self):
+        """Function should be able to load a folder of configs packed in an archive."""
+        for parser in self.parsers:
+            parser = parser()
+            ext = parser.extension
+            config_folder = self.config_folder[ext]
+            for archive_format, archive_ext in [("gztar", ".tar.gz"), ("zip", ".zip")]:
+                with tempfile.TemporaryDirectory() as tempdirname:
+                    archive_path = shutil.make_archive(
+                        os.path.join(tempdirname, "config"), archive_format, config_folder
+                    )
+                    self.assertTrue(archive_path.endswith(archive_ext))
+                    loaded_config = parser.load(archive_path, replace=True).config
+                    msg = f"loading {parser} with {archive_ext} archive of config"
+                    self.assertEqual(loaded_config, self.config_truth, msg)
+
+                    # members that cannot contain the selected keys are not parsed
+                    with mock.patch.object(
+                            parser, "_load_stream", wraps=parser._load_stream) as load_stream:
+                        loaded_config = parser.load(
+                            archive_path, replace=True, select=("name", )).config
+                    self.assertEqual(loaded_config, {"name": "config-01"}, msg)
+                    # the top level files only, not the function folder
+                    self.assertEqual(load_stream.call_count, 2, msg)
+
+    def test_select(self):
+        """Function should keep only the selected key paths."""
+        config_truth = {
+            "function": {"function1": self.config_truth["function"]["function1"]},
+            "parameters": {"max_time": 40},
+        }
+        select = ("function.function1", "parameters.max_time")
+        for parser in self.parsers:
+            parser = parser()
+            ext = parser.extension
+            loaded_config = parser.load(
+                self.config_folder[ext], replace=True, select=select).config
+            msg = f"loading {parser} with selected keys"
+            self.assertEqual(loaded_config, config_truth, msg)
+
+            # folders that cannot contain the selected keys are not read
+            with mock.patch.object(parser, "_load_file") as load_file:
+                loaded_config = parser.load(
+                    os.path.join(self.config_folder[ext], "function"), replace=True,
+                    select=("name", )).config
+                load_file.assert_not_called()
+            self.assertEqual(loaded_config, {}, msg)
+
+    def test_stream(self):
+        """Json parser should parse large files incrementally to the same config."""
+        parser = JsonParser()
+        parser.stream_size = 0
+        loaded_config = parser.load(self.config_folder["json"], replace=True).config
+        self.assertEqual(loaded_config, self.config_truth, parser)
+
+        # values split across chunks are decoded whole
+        sample_config = self.config_dict_raw["json"]
+        for chunk_size in (1, 7, 64):
+            config_stream = json_parser._iter_stream(io.StringIO(sample_config), chunk_size)
+            self.assertEqual(dict(config_stream), self.config_truth, chunk_size)
+        self.assertRaises(
+            ValueError, list, json_parser._iter_stream(io.StringIO(sample_config[:-2]), 7))
+
+        # the size of compressed files is not the size of their text, always streamed
+        with tempfile.TemporaryDirectory() as tempdirname:
+            config_path = os.path.join(tempdirname, "config.json.gz")
+            JsonParser(self.config_truth).write(config_path)
+            parser = JsonParser()
+            with mock.patch.object(
+                    json_parser, "iter_items", wraps=json_parser.iter_items) as iter_items:
+                self.assertEqual(dict(parser._iter_method(config_path)), self.config_truth)
+                self.assertEqual(parser._load_method(config_path), self.config_truth)
+            self.assertEqual(iter_items.call_count, 2)
+
+            # the pure python fallback without ijson
+            with mock.patch.object(json_parser, "ijson", None):
+                self.assertEqual(dict(json_parser.iter_items(config_path)), self.config_truth)
+
+    @unittest.skipIf(json_parser.ijson is None, "requires ijson")
+    def test_stream_ijson(self):
+        """Json parser should parse large files with ijson to the same config."""
+        with mock.patch.object(json_parser._ObjectReader, "decode") as decode:
+            config_stream = json_parser.iter_items(self.config_path["json"])
+            self.assertEqual(dict(config_stream), self.config_truth)
+        decode.assert_not_called()
+
+    def test_cache(self):
+        """Cached files should be handed out as new copies, the least recently used evicted."""
+        for parser in self.parsers:
+            parser = parser(cache={})
+            parser.cache_size = 1
+            config = parser._load_file(self.config_path[parser.extension])
+            config["parameters"]["num_nodes"] = 0
+            cached_config = parser._load_file(self.config_path[parser.extension])
+            self.assertEqual(cached_config, self.config_truth, parser)
+            self.assertEqual(list(parser.cache), [self.config_path[parser.extension]])
+
+            main_path = os.path.join(
+                self.config_folder[parser.extension], f"main.{parser.extension}")
+            parser._load_file(main_path)
+            self.assertEqual(list(parser.cache), [os.path.abspath(main_path)])
+
+    def test_explode(self):
+        """Function should write a config as folder tree which loads back the same."""
+        for parser in self.parsers:
+            parser = parser()
+            for depth in (0, 1, 2):
+                with tempfile.TemporaryDirectory() as tempdirname:
+                    parser.explode(tempdirname, self.config_truth, depth=depth)
+                    loaded_config = parser.load(tempdirname + os.sep, replace=True).config
+                    msg = f"explode {parser} with depth {depth}"
+                    self.assertEqual(loaded_config, self.config_truth, msg)
+
+                    # unchanged shards are not written again
+                    shard_path = os.path.join(tempdirname, f"name.{parser.extension}")
+                    os.utime(shard_path, ns=(0, 0))
+                    parser.explode(tempdirname, self.config_truth, depth=depth)
+                    self.assertEqual(os.stat(shard_path).st_mtime_ns, 0, msg)
+
+        # shards can be written in different formats
+        formats = {"pipeline": YamlParser()}
+        with tempfile.TemporaryDirectory() as tempdirname:
+            JsonParser().explode(tempdirname, self.config_truth, formats=formats)
+            self.assertTrue(os.path.isfile(os.path.join(tempdirname, "pipeline.yml")))
+            loaded_config = YamlParser().load(tempdirname + os.sep, replace=True).config
+            self.assertEqual(loaded_config["pipeline"], self.config_truth["pipeline"])
+
+        # keys named as the folder are not written as folders, load ignores them as keys
+        config = {"y": 2, "function": {"out": {"x": 1}, "function": {"a": 1}}}
+        with tempfile.TemporaryDirectory() as tempdirname:
+            folder = os.path.join(tempdirname, "out")
+            JsonParser().explode(folder, config, depth=2)
+            loaded_config = JsonParser().load(folder + os.sep, replace=True).config
+            self.assertEqual(loaded_config, config)
+            self.assertRaises(
+                ValueError, JsonParser().explode, folder, {"out": {"x": 1}, "y": 2}, depth=2)
+
+        # keys written to the same file name
+        config = {"a": 1, "a.json": 2}
+        with tempfile.TemporaryDirectory() as tempdirname:
+            JsonParser().explode(tempdirname, config, depth=0)
+            self.assertEqual(len(os.listdir(tempdirname)), 2)
+            loaded_config = JsonParser().load(tempdirname + os.sep, replace=True).config
+            self.assertEqual(loaded_config, config)
+
+    def test_convert_tree(self):
+        """Function should convert a folder of configs into another file type."""
+        for parser in self.parsers:
+            parser = parser()
+            ext = parser.extension
+            for other_parser in self.parsers:
+                other_parser = other_parser()
+                other_ext = other_parser.extension
+                with tempfile.TemporaryDirectory() as tempdirname:
+                    result = convert_tree(self.config_folder[ext], tempdirname, other_ext)
+                    self.assertEqual(result["converted"], 4, f"{parser}, {other_parser}")
+                    loaded_config = other_parser.load(tempdirname + os.sep, replace=True).config
+                    self.assertEqual(loaded_config, self.config_truth, f"{parser}, {other_parser}")
+
+                    # outputs newer than the config files are skipped
+                    result = convert_tree(self.config_folder[ext], tempdirname, other_ext)
+                    self.assertEqual(result["converted"], 0, f"{parser}, {other_parser}")
+                    self.assertEqual(result["skipped"], 4, f"{parser}, {other_parser}")
+
+    def test_convert_tree_folder_key(self):
+        """Function should keep top level keys named as their folder."""
+        config = {"params": {"a": 1}, "b": 2}
+        with tempfile.TemporaryDirectory() as tempdirname:
+            src_folder = os.path.join(tempdirname, "src")
+            os.makedirs(os.path.join(src_folder, "params"))
+            JsonParser(config).write(os.path.join(src_folder, "params", "p.json"))
+            dst_folder = os.path.join(tempdirname, "dst")
+            convert_tree(src_folder, dst_folder, "yml")
+            self.assertEqual(
+                YamlParser()._load_method(os.path.join(dst_folder, "params", "p.yml")), config)
+
+    def test_compression(self):
+        """Function should read and write compressed config files by file extension."""
+        for parser in self.parsers:
+            parser = parser(self.config_truth)
+            ext = parser.extension
+            for compression in (".gz", ".xz", ".bz2"):
+                self.assertEqual(
+                    f"config.{ext}{compression}",
+                    parser._append_extension(f"config{compression}"))
+                with tempfile.TemporaryDirectory() as tempdirname:
+                    filename = os.path.join(tempdirname, f"config.{ext}{compression}")
+                    parser.compression_level = 1
+                    parser.write(filename)
+                    with open(filename, "rb") as file:
+                        self.assertNotIn(b"config-01", file.read(), compression)
+                    loaded_config = parser.load(tempdirname + os.sep, replace=True).config
+                    self.assertEqual(loaded_config, self.config_truth, compression)
+
+    def test_interpolate(self):
+        """Function should resolve references between files once they are merged."""
+        for parser in self.parsers:
+            with tempfile.TemporaryDirectory() as tempdirname:
+                parser({"name": "config-01"}).write(os.path.join(tempdirname, "main"))
+                parser({"function": {"owner": "${name}"}}).write(
+                    os.path.join(tempdirname, "function"))
+                loaded_config = parser().load(tempdirname + os.sep, interpolate=True).config
+                self.assertEqual(loaded_config["function"]["owner"], "config-01")
+                loaded_config = parser().load(tempdirname + os.sep).config
+                self.assertEqual(loaded_config["function"]["owner"], "${name}")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,79 @@
+"""Test the key provenance index."""
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from genconfig.cli import build, entry, parse_args, save
+from genconfig.provenance import Provenance
+from genconfig.utils import merge
+
+
+class TestProvenance(unittest.TestCase):
+    """Perform unit test for recording and reading where keys came from."""
+
+    base_path = os.path.dirname(os.path.realpath(__file__))
+    config_folder = os.path.join(base_path, os.pardir, os.pardir, "sample-config", "config-json")
+
+    def test_merge(self):
+        """Merge should record the changes where they happen, in merge order."""
+        provenance = Provenance()
+        config = {}
+        provenance.begin("a.json")
+        merge(config, {"parameters": {"num_nodes": 200}, "pipeline": [1]}, provenance=provenance)
+        provenance.begin("b.json")
+        merge(config, {"parameters": {"max_time": 40}, "pipeline": [2]}, provenance=provenance)
+        provenance.begin("c.json")
+        merge(config, {"parameters": {"num_nodes": 100}}, provenance=provenance)
+
+        self.assertEqual(provenance.files, ["a.json", "b.json", "c.json"])
+        self.assertEqual(provenance.blame("parameters.num_nodes"), [
+            (0, "parameters", "set", "a.json"),
+            (2, "parameters", "conflict", "c.json"),
+        ])
+        self.assertEqual(provenance.blame("pipeline"), [
+            (0, "pipeline", "set", "a.json"),
+            (1, "pipeline", "append", "b.json"),
+        ])
+        self.assertEqual(
+            [(key, source) for _, key, _, source in provenance.blame("parameters")],
+            [("parameters", "a.json"), ("parameters.max_time", "b.json"),
+             ("parameters", "c.json")])
+        self.assertEqual(provenance.blame("missing"), [])
+
+    def test_blame(self):
+        """Build should write the index next to the output, read back by genconfig blame."""
+        with tempfile.TemporaryDirectory() as tempdirname:
+            output_path = os.path.join(tempdirname, "config.json")
+            args = parse_args([self.config_folder, "-o", output_path, "--provenance",
+                               "-a", '{"name": "config-02"}'])
+            save(build(args), args)
+
+            provenance = Provenance.read(output_path + ".provenance")
+            self.assertEqual(
+                [(change, source) for _, _, change, source in provenance.blame("name")],
+                [("set", os.path.join(self.config_folder, "main.json")),
+                 ("override", "--append")])
+            self.assertEqual(
+                provenance.blame("function.function1.name")[0][3],
+                os.path.join(self.config_folder, "function", "function_1.json"))
+
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                entry(["blame", "parameters.num_nodes", output_path])
+            self.assertIn("main.json", stdout.getvalue())
+            with self.assertRaises(SystemExit):
+                entry(["blame", "missing", output_path])
+
+            # the index is recorded by build
+            args = parse_args([self.config_folder, "-o", output_path, "--provenance"])
+            self.assertRaises(ValueError, save, {"name": "config-01"}, args)
+
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.assertRaises(SystemExit, parse_args, [self.config_folder, "--provenance"])
+        self.assertIn("--provenance requires -o", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
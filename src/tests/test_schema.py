@@ -0,0 +1,127 @@
+"""Test the schema validation while merging."""
+import os
+import tempfile
+import unittest
+
+from genconfig.cli import build, parse_args
+from genconfig.parsers import JsonParser
+from genconfig.schema import Schema, SchemaError
+from genconfig.utils import compact, merge, numpy
+
+
+class TestSchema(unittest.TestCase):
+    """Perform unit test for checking values against a schema."""
+
+    schema = {
+        "type": "object",
+        "required": ["name", "parameters"],
+        "properties": {
+            "name": {"type": "string", "pattern": "^config-"},
+            "parameters": {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {
+                    "num_nodes": {"type": "integer", "minimum": 1},
+                    "max_time": {"type": "number", "exclusiveMaximum": 60},
+                    "label": {"type": "string"},
+                },
+            },
+            "pipeline": {
+                "type": "array",
+                "items": {"type": "object", "required": ["name"],
+                          "properties": {"name": {"enum": ["extraction", "training"]}}},
+            },
+        },
+    }
+
+    def write(self, folder, name, config):
+        """Writes a json config file into the folder."""
+        JsonParser(config).write(os.path.join(folder, name))
+        return os.path.join(folder, f"{name}.json")
+
+    def test_merge(self):
+        """Merge should check the values it inserts."""
+        schema = Schema(self.schema)
+        config = {}
+        merge(config, {"parameters": {"num_nodes": 0}, "pipeline": [{"name": "extraction"}]},
+              schema=schema.root)
+        merge(config, {"parameters": {"seed": 1}, "pipeline": [{"name": "load"}]},
+              schema=schema.root)
+        self.assertEqual([(v.path, v.message) for v in schema.violations], [
+            ("parameters.num_nodes", "expected at least 1"),
+            ("parameters.seed", "unexpected key"),
+            ("pipeline.1.name", "expected one of ['extraction', 'training']"),
+        ])
+        with self.assertRaisesRegex(SchemaError, "name: missing required key"):
+            schema.check(config)
+
+        # conflicting dictionaries become a list at the parent key
+        schema = Schema(self.schema)
+        config = {"parameters": {"num_nodes": 1}}
+        merge(config, {"parameters": {"num_nodes": 2}}, schema=schema.root)
+        self.assertEqual(config["parameters"], [{"num_nodes": 1}, {"num_nodes": 2}])
+        self.assertEqual([(v.path, v.message) for v in schema.violations], [
+            ("parameters", "expected object got list")])
+
+        self.assertRaisesRegex(ValueError, "Unknown schema type 'int'", Schema, {"type": "int"})
+
+    @unittest.skipIf(numpy is None, "requires numpy")
+    def test_numpy(self):
+        """NumPy scalars of compacted lists should be integers and numbers."""
+        schema = Schema({"properties": {
+            "steps": {"type": "array", "items": {"type": "integer", "minimum": 0}},
+            "grid": {"type": "array", "items": {"type": "number"}}}})
+        schema.root.validate(compact({"steps": list(range(16)), "grid": [0.5] * 16}, "numpy"), [])
+        self.assertEqual(schema.violations, [])
+
+    def test_load(self):
+        """Load should report every violation with its file, or stop at the first."""
+        with tempfile.TemporaryDirectory() as tempdirname:
+            main_path = self.write(tempdirname, "main", {"name": "other", "parameters": {}})
+            parameters_path = self.write(
+                tempdirname, "parameters", {"parameters": {"max_time": 60, "label": True}})
+            with self.assertRaises(SchemaError) as context:
+                JsonParser().load(tempdirname + os.sep, schema=self.schema)
+            self.assertEqual([(v.source, v.path) for v in context.exception.violations], [
+                (main_path, "name"),
+                (parameters_path, "parameters.max_time"),
+                (parameters_path, "parameters.label"),
+            ])
+
+            schema = Schema(self.schema, fail_fast=True)
+            with self.assertRaises(SchemaError):
+                JsonParser().load(tempdirname + os.sep, schema=schema)
+            self.assertEqual(len(schema.violations), 1)
+
+            # the violations of a previous load are not reported again
+            valid_path = os.path.join(tempdirname, "valid")
+            os.makedirs(valid_path)
+            self.write(valid_path, "main", {"name": "config-01", "parameters": {}})
+            config = JsonParser().load(valid_path + os.sep, schema=schema).config
+            self.assertEqual(config["name"], "config-01")
+            self.assertEqual(schema.violations, [])
+
+    def test_references(self):
+        """References should be checked once resolved."""
+        with tempfile.TemporaryDirectory() as tempdirname:
+            self.write(tempdirname, "main", {
+                "name": "config-01", "nodes": 2,
+                "parameters": {"num_nodes": "${nodes}", "label": "${name}"}})
+            config = JsonParser().load(
+                tempdirname + os.sep, schema=self.schema, interpolate=True).config
+            self.assertEqual(config["parameters"], {"num_nodes": 2, "label": "config-01"})
+
+            schema_path = self.write(tempdirname, "schema", self.schema)
+            os.remove(os.path.join(tempdirname, "main.json"))
+            self.write(tempdirname, "main", {
+                "name": "config-01", "nodes": "two",
+                "parameters": {"num_nodes": "${nodes}"}})
+            args = parse_args([
+                os.path.join(tempdirname, "main.json"), "--schema", schema_path,
+                "--interpolate"])
+            with self.assertRaisesRegex(SchemaError, "parameters.num_nodes: expected integer"):
+                build(args)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Test the shared config publication."""
+import os
+import tempfile
+import threading
+import unittest
+
+from genconfig.shared import SharedConfig, publish
+
+
+class TestShared(unittest.TestCase):
+    """Perform unit test for publishing and reading shared configs."""
+
+    config = {
+        "name": "config-01",
+        "parameters": {"num_nodes": 200, "max_time": 40},
+        "function": {"function1": {"name": "transform"}, "empty": {}},
+        "pipeline": [{"name": "extraction"}, {"name": "training"}],
+    }
+
+    def test_publish(self):
+        """Published config should be looked up by key from another reader."""
+        with tempfile.TemporaryDirectory() as tempdirname:
+            path = os.path.join(tempdirname, "config.gcfg")
+            self.assertEqual(publish(self.config, path), 1)
+            with SharedConfig(path) as shared:
+                self.assertEqual(shared.generation, 1)
+                self.assertEqual(shared.get(""), self.config)
+                self.assertEqual(shared["parameters.num_nodes"], 200)
+                self.assertEqual(shared[("function", "function1")], {"name": "transform"})
+                self.assertEqual(shared["function.empty"], {})
+                self.assertEqual(shared["pipeline"], self.config["pipeline"])
+                self.assertIn("function", shared)
+                self.assertNotIn("parameters.num", shared)
+                self.assertIsNone(shared.get("missing"))
+                self.assertRaises(KeyError, shared.__getitem__, "missing")
+                self.assertEqual(
+                    list(shared.keys("parameters")),
+                    ["parameters.max_time", "parameters.num_nodes"])
+
+    @unittest.skipUnless(hasattr(os, "fchmod"), "requires POSIX file modes")
+    def test_mode(self):
+        """Published file should be readable by other users as the umask allows."""
+        umask = os.umask(0o022)
+        try:
+            with tempfile.TemporaryDirectory() as tempdirname:
+                path = os.path.join(tempdirname, "config.gcfg")
+                publish(self.config, path)
+                self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+                os.umask(0o027)
+                publish(self.config, path)
+                self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+        finally:
+            os.umask(umask)
+
+    def test_refresh(self):
+        """Reader should only swap to a new generation on refresh."""
+        with tempfile.TemporaryDirectory() as tempdirname:
+            path = os.path.join(tempdirname, "config.gcfg")
+            publish(self.config, path)
+            with SharedConfig(path) as shared:
+                self.assertFalse(shared.refresh())
+                self.assertEqual(publish({"name": "config-02"}, path), 2)
+                self.assertEqual(shared["name"], "config-01")
+                self.assertTrue(shared.refresh())
+                self.assertEqual(shared.generation, 2)
+                self.assertEqual(shared.get(""), {"name": "config-02"})
+
+    def test_concurrent(self):
+        """Concurrent publishers should publish every generation once."""
+        with tempfile.TemporaryDirectory() as tempdirname:
+            path = os.path.join(tempdirname, "config.gcfg")
+            generations = []
+            threads = [
+                threading.Thread(target=lambda: generations.append(publish(self.config, path)))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(sorted(generations), list(range(1, 9)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Test the SQLite config store."""
+import copy
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from genconfig.cli import build, new_parsers, parse_args, save
+from genconfig.parsers import JsonParser, YamlParser
+from genconfig.store import SqliteStore
+from genconfig.utils import merge
+
+
+class TestStore(unittest.TestCase):
+    """Perform unit test for merging into and reading from the store."""
+
+    base_path = os.path.dirname(os.path.realpath(__file__))
+    config_folder = os.path.join(base_path, os.pardir, os.pardir, "sample-config", "config-json")
+
+    fragments = [
+        {"name": "config-01", "parameters": {"num_nodes": 200}, "pipeline": [{"name": "a"}]},
+        {"parameters": {"max_time": 40}, "pipeline": [{"name": "b"}], "empty": {}},
+        # conflicting leaf, the parameters become a list of both dictionaries
+        {"name": "config-01", "parameters": {"num_nodes": 100, "seed": 1}, "empty": {"a": 1}},
+        # conflicting top level leaf is ignored
+        {"name": "config-02", "function": {"function1": {"name": "transform"}}},
+        # conflict after a merged key, the whole dictionary is appended
+        {"sources": {"x": 1}},
+        {"sources": {"z": 5, "x": 2}},
+    ]
+
+    def test_merge(self):
+        """Store should merge fragments the same as merge."""
+        expected = {}
+        with SqliteStore() as store:
+            for fragment in self.fragments:
+                merge(expected, copy.deepcopy(fragment))
+                store.merge(fragment)
+                # in the same key order
+                self.assertEqual(json.dumps(store.get("")), json.dumps(expected))
+
+            self.assertEqual(store["function.function1.name"], "transform")
+            self.assertEqual(store[("function", "function1")], {"name": "transform"})
+            self.assertIn("function", store)
+            self.assertNotIn("function.function", store)
+            self.assertIsNone(store.get("missing"))
+            self.assertRaises(KeyError, store.__getitem__, "missing")
+            self.assertEqual(
+                list(store.items("function")), [("function.function1.name", "transform")])
+
+    def test_override(self):
+        """Store should override or raise on conflicts as merge."""
+        with SqliteStore() as store:
+            store.merge({"a": {"b": 1, "c": [1]}})
+            self.assertRaises(ValueError, store.merge, {"a": {"b": 2}}, merge_conflict=False)
+            store.merge({"a": {"b": {"d": 2}}}, merge_conflict=False, raise_conflict=False)
+            store.merge({"d": 3}, path="a.b")
+            self.assertEqual(store.get(""), {"a": {"b": [{"d": 2}, {"d": 3}], "c": [1]}})
+            self.assertEqual(store.select(("a.c", )).get(""), {"a": {"c": [1]}})
+
+            # non string keys would be read back as strings
+            self.assertRaisesRegex(ValueError, "Cannot store the key 1 at a", store.merge,
+                                   {"a": {1: "one"}})
+
+    def test_write(self):
+        """Store should write the same text as the parsers."""
+        config = {"name": "config-01", "parameters": {"num_nodes": 200}, "empty": {}}
+        # keys in merge order, overridden keys keep their place
+        fragment = {"parameters": {"seed": 1, "num_nodes": {"max": 300}}, "a": 1}
+        with SqliteStore() as store:
+            store.merge(config)
+            store.merge(fragment, merge_conflict=False, raise_conflict=False)
+            merge(config, fragment, merge_conflict=False, raise_conflict=False)
+            for parser in (JsonParser(), YamlParser()):
+                stream = io.StringIO()
+                parser._write_items(stream, store.top_items())
+                expected = io.StringIO()
+                type(parser)(config)._write_stream(expected)
+                self.assertEqual(stream.getvalue(), expected.getvalue())
+
+            stream = io.StringIO()
+            JsonParser()._write_items(stream, SqliteStore().top_items())
+            self.assertEqual(json.loads(stream.getvalue()), {})
+
+    def test_build(self):
+        """Build with a store should write the same config as in memory."""
+        with tempfile.TemporaryDirectory() as tempdirname:
+            output_path = os.path.join(tempdirname, "config.json")
+            store_path = os.path.join(tempdirname, "config.sqlite")
+            args = parse_args([self.config_folder, "-o", output_path])
+            save(build(args), args)
+            with open(output_path) as file:
+                expected = file.read()
+
+            args = parse_args([self.config_folder, "-o", output_path, "--store", store_path])
+            # built twice to check the store is cleared
+            build(args).close()
+            parsers = new_parsers()
+            store = build(args, parsers)
+            save(store, args)
+            store.close()
+            with open(output_path) as file:
+                self.assertEqual(file.read(), expected)
+            # the files are merged into the store as parsed, not kept by the parsers
+            self.assertNotIn("name", parsers["json"].config)
+
+
+if __name__ == "__main__":
+    unittest.main()
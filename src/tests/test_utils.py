@@ -0,0 +1,92 @@
+"""Test the config utilities."""
+import array
+import io
+import json
+import unittest
+
+from genconfig.parsers import JsonParser, YamlParser
+from genconfig.utils import compact, flatten, merge, numpy
+
+
+class TestUtils(unittest.TestCase):
+    """Perform unit test for the config utilities."""
+
+    def test_flatten(self):
+        """Function should yield dotted keys with list indices for every leaf value."""
+        config = {
+            "name": "config-01",
+            "pipeline": [{"name": "extraction"}, "training"],
+            "function": {"function.1": {"param": "col1"}, "empty": {}},
+        }
+        self.assertEqual(list(flatten(config)), [
+            ("name", "config-01"),
+            ("pipeline.0.name", "extraction"),
+            ("pipeline.1", "training"),
+            ("function.function\\.1.param", "col1"),
+            ("function.empty", {}),
+        ])
+        self.assertEqual(list(flatten({})), [])
+
+    def test_flatten_conflict(self):
+        """Conflicts merged into a list should be keyed by their merge order."""
+        config = merge({"function": {"name": "transform"}}, {"function": {"name": "load"}})
+        self.assertEqual(list(flatten(config)), [
+            ("function.0.name", "transform"),
+            ("function.1.name", "load"),
+        ])
+
+    def test_compact(self):
+        """Homogeneous numeric lists should be stored as arrays and written as lists."""
+        config = {
+            "grid": [0.5] * 16,
+            "steps": list(range(16)),
+            "short": [1, 2],
+            "mixed": [1, 2.5] * 8,
+            "layers": [{"weights": [1.5] * 16}],
+        }
+        expected = json.loads(json.dumps(config))
+        compact(config)
+        self.assertEqual(config["grid"], array.array("d", [0.5] * 16))
+        self.assertEqual(config["steps"], array.array("q", range(16)))
+        self.assertEqual(config["short"], [1, 2])
+        self.assertIsInstance(config["mixed"], list)
+        self.assertIsInstance(config["layers"][0]["weights"], array.array)
+
+        for parser in (JsonParser(), YamlParser()):
+            stream = io.StringIO()
+            parser.config = config
+            parser._write_stream(stream)
+            stream.seek(0)
+            self.assertEqual(parser._load_stream(stream), expected)
+
+    def test_compact_merge(self):
+        """Arrays should be concatenated in place and compared by their items."""
+        a = compact({"grid": [0.5] * 16, "steps": list(range(16))})
+        grid = a["grid"]
+        merge(a, compact({"grid": [1.5] * 16, "steps": list(range(16))}))
+        self.assertIs(a["grid"], grid)
+        self.assertEqual(a["grid"], array.array("d", [0.5] * 16 + [1.5] * 16))
+        self.assertEqual(a["steps"], array.array("q", range(16)))
+
+        # integers are kept exact when merged with floats
+        merge(a, compact({"steps": [0.5] * 16}))
+        self.assertEqual(a["steps"], list(range(16)) + [0.5] * 16)
+        self.assertIsInstance(a["steps"][15], int)
+
+        merge(a, {"steps": [0.5]})
+        self.assertEqual(a["steps"], list(range(16)) + [0.5] * 17)
+
+    @unittest.skipIf(numpy is None, "requires numpy")
+    def test_compact_numpy(self):
+        """NumPy arrays should be concatenated instead of added."""
+        a = compact({"grid": [0.5] * 16}, "numpy")
+        self.assertIsInstance(a["grid"], numpy.ndarray)
+        merge(a, compact({"grid": [1.5] * 16}, "numpy"))
+        self.assertEqual(a["grid"].tolist(), [0.5] * 16 + [1.5] * 16)
+
+        merge(a, compact({"grid": [2 ** 53 + 1] * 16}, "numpy"))
+        self.assertEqual(a["grid"][32:], [2 ** 53 + 1] * 16)
+
+
+if __name__ == "__main__":
+    unittest.main()